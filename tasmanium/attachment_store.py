@@ -0,0 +1,46 @@
+import hashlib
+import os
+import shutil
+from shutil import copy2
+from typing import AnyStr, Tuple
+
+from tasmanium import logger
+
+l = logger.getLogger(__name__)
+
+ATTACHMENTS_PATH = f"{logger.LOGFILE_PATH}/attachments"
+
+
+def clear():
+    """Remove attachments of the previous run"""
+    shutil.rmtree(ATTACHMENTS_PATH, ignore_errors=True)
+
+
+def store(data: bytes) -> Tuple[AnyStr, int]:
+    """
+    Write attachment data into the store and return its path and size.
+    Files are named by the hash of their content, so the same data attached many times are stored only once.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    path = f"{ATTACHMENTS_PATH}/{digest[:2]}/{digest}"
+    if os.path.exists(path):
+        l.ttrace(f"attachment '{digest}' already stored")
+        return path, len(data)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path, len(data)
+
+
+def link(path: AnyStr, destination: AnyStr):
+    """Hardlink a stored attachment to the destination, or copy it if hardlinks are not possible, e.g. across filesystems"""
+    if os.path.lexists(destination):
+        os.remove(destination)
+    try:
+        os.link(path, destination)
+    except OSError as e:
+        l.ttrace(f"could not hardlink '{path}', copying instead: {e}")
+        copy2(path, destination)
@@ -1,17 +1,19 @@
 import importlib
 import json
+import mimetypes
 import time
 import traceback
+from collections import OrderedDict
 from typing import AnyStr, Dict, Optional, List, Tuple, Callable, Set, Any
 from uuid import uuid4
 
-from parse import parse
+import cucumber_tag_expressions
 
-from tasmanium import logger
-from tasmanium.constants import STATUS_PASSED, STATUS_FAILED, STATUS_SKIPPED, STATUS_NOT_EXECUTED
-from tasmanium.exceptions import KeywordError, StepNotFoundError, EmptyFeatureError
-from tasmanium.gherkin.parser import Parser
-from tasmanium.gherkin.pickles.compiler import compile
+from tasmanium import logger, events, attachment_store
+from tasmanium.constants import STATUS_PASSED, STATUS_FAILED, STATUS_SKIPPED, STATUS_NOT_EXECUTED, STEP_BINDING_CACHE_SIZE
+from tasmanium.exceptions import KeywordError, StepNotFoundError, EmptyFeatureError, LineNotFoundError
+from tasmanium.gherkin.pickles.compiler import pickle_steps, skipped_pickle
+from tasmanium.parse_cache import load_pickles, parse_pickles
 from tasmanium.registrars import step_registrar, before_feature, before_scenario, before_step, after_step, after_scenario, after_feature
 
 l = logger.getLogger(__name__)
@@ -20,6 +22,13 @@ l = logger.getLogger(__name__)
 class Options:
     def __init__(self):
         self.failed_repeat_count: int = 0
+        self.parse_cache: bool = True
+        # user tag expressions by tag level ('flat' for all levels together), scenarios not matching them are not even parsed
+        self.tag_expressions: Dict[AnyStr, AnyStr] = {}
+        # selected scenario/example row lines by feature file path, files not listed run all their scenarios
+        self.line_selection: Dict[AnyStr, Set[int]] = {}
+        # every process executing tests appends its execution events to an NDJSON file
+        self.event_log: bool = False
 
 
 class Context:
@@ -78,7 +87,7 @@ class Context:
         """
         Attach plaintext data to the step. Can be attached anytime during step execution. Attachment order is preserved.
         If no filename is provided, it will be generated.
-        TODO: Attachment data are kept in memory at the moment, which is unnecessary and can consume a lot of memory.
+        The data are written to disk right away, only the path to them is kept.
         """
         self.__step.attach_plaintext(data=data, filename=filename, description=description)
 
@@ -86,7 +95,7 @@ class Context:
         """
         Attach image data to the step. Can be attached anytime during step execution. Attachment order is preserved.
         TODO: Filename is mandatory because of image extension. But the image encoding could be detected.
-        TODO: Attachment data are kept in memory at the moment, which is unnecessary and can consume a lot of memory.
+        The data are written to disk right away, only the path to them is kept.
         """
         self.__step.attach_image(data=data, filename=filename, description=description)
 
@@ -144,12 +153,63 @@ class Context:
 
 
 class Attachment:
-    def __init__(self, type: AnyStr, filename: AnyStr, data: bytes, description: Optional[AnyStr] = None):
+    """Attached file kept in the attachment store, see `attachment_store.store`"""
+
+    def __init__(self, type: AnyStr, filename: AnyStr, path: AnyStr, size: int, media_type: AnyStr, description: Optional[AnyStr] = None):
         self.type: AnyStr = type
         self.filename: AnyStr = filename
-        self.data: bytes = data
+        self.path: AnyStr = path
+        self.size: int = size
+        self.media_type: AnyStr = media_type
         self.description: Optional[AnyStr] = description
 
+    @classmethod
+    def store(cls, type: AnyStr, filename: AnyStr, data: bytes, media_type: AnyStr, description: Optional[AnyStr] = None):
+        path, size = attachment_store.store(data)
+        return cls(type, filename, path, size, media_type, description)
+
+
+class BindingCache:
+    """
+    Bounded LRU cache of step bindings keyed by `(keyword, text)`.
+    Parsed kwargs are stored as a tuple of items, so every step gets its own copy.
+    Entries bound before a new step definition was registered are treated as misses.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size: int = max_size
+        self.hits: int = 0
+        self.misses: int = 0
+        self.__entries: OrderedDict = OrderedDict()
+
+    def bind(self, keyword: AnyStr, text: AnyStr) -> Tuple[Callable, Dict]:
+        matcher = step_registrar[keyword].matcher
+        key = (keyword, text)
+        entry = self.__entries.get(key)
+        if entry is not None and entry[0] == matcher.version:
+            self.hits += 1
+            self.__entries.move_to_end(key)
+            return entry[1], dict(entry[2])
+
+        self.misses += 1
+        match = matcher.match(text)
+        if match is None:
+            raise StepNotFoundError(f"Could not find any step definition for step '{keyword} {text}'.")
+        function, kwargs = match
+        self.__entries[key] = (matcher.version, function, tuple(kwargs.items()))
+        self.__entries.move_to_end(key)
+        if len(self.__entries) > self.max_size:
+            self.__entries.popitem(last=False)
+        return function, dict(kwargs)
+
+    def clear(self):
+        self.hits = 0
+        self.misses = 0
+        self.__entries.clear()
+
+
+binding_cache = BindingCache(STEP_BINDING_CACHE_SIZE)
+
 
 class Step:
     def __init__(self, raw_step, last_absolute_keyword: List[AnyStr], context_ref: Context):
@@ -179,6 +239,31 @@ class Step:
         self.attachments: List[List[Attachment]] = []
         self.increment()
 
+    def __getstate__(self):
+        # the context is re-attached by `Feature.set_context` after unpickling
+        state = self.__dict__.copy()
+        state['context_ref'] = None
+        return state
+
+    def result_record(self) -> Dict[AnyStr, Any]:
+        """
+        Compact summary of the step results which is cheap to send to another process, see `apply_result_record`.
+        Exception objects are left out, only their name, args and traceback are kept.
+        """
+        return {
+            'identifiers': self.identifiers,
+            'results': [_compact_step_results(results) for results in self.results],
+            'attachments': [[(a.type, a.filename, a.path, a.size, a.media_type, a.description) for a in attachments]
+                            for attachments in self.attachments],
+        }
+
+    def apply_result_record(self, record: Dict[AnyStr, Any]):
+        """Update the step with results executed elsewhere, see `result_record`"""
+        self.identifiers = record['identifiers']
+        self.repeat_count = len(self.identifiers) - 1
+        self.results = record['results']
+        self.attachments = [[Attachment(*attachment) for attachment in attachments] for attachments in record['attachments']]
+
     def last_id(self) -> str:
         return self.identifiers[self.repeat_count]
 
@@ -249,25 +334,7 @@ class Step:
 
     def __bind_corresponding_function(self) -> Tuple[Callable, Dict]:
         """Try to match step's text with a function and parse arguments"""
-        func_dict: Dict = step_registrar[self.keyword].all
-        function = func_dict.get(self.text)
-        args = {}
-        if function is None:
-            found = False
-            for decorator_text, function in func_dict.items():
-                r = parse(decorator_text, self.text)
-                if r is not None:
-                    found = True
-                    args = r.named
-                    l.ttrace(f"args parsed from '{self.text}' by '{decorator_text}': {args}")
-                    break
-
-            if not found:
-                raise StepNotFoundError(f"Could not find any step definition for step '{self.keyword} {self.text}'.")
-        else:
-            l.ttrace(f"binding '{self.text}' to function '{function.__name__}'")
-
-        return function, args
+        return binding_cache.bind(self.keyword, self.text)
 
     def __update_context(self):
         l.ttrace("updating context step data...")
@@ -288,7 +355,7 @@ class Step:
         if self.data_table is not None:
             self.attach_plaintext(filename="data_table.json", description="data table parsed as JSON",
                                   data=json.dumps(self.data_table, indent=4, sort_keys=False))
-        l.ttrace(f"executing step '{self.text}' aka function '{self.corresponding_function.__name__}' with args {self.function_kwargs}...")
+        l.ttrace("executing step '%s' aka function '%s' with args %s...", self.text, self.corresponding_function.__name__, self.function_kwargs)
         start = time.perf_counter_ns()
         try:
             self.corresponding_function(self.context_ref, **self.function_kwargs)
@@ -319,7 +386,7 @@ class Step:
         if filename is None:
             filename = f"{self.last_id()}-{len(self.last_attachments())}.txt"
 
-        self.last_attachments().append(Attachment('plaintext', filename, bytes(data, encoding='utf-8'), description))
+        self.last_attachments().append(Attachment.store('plaintext', filename, bytes(data, encoding='utf-8'), 'text/plain', description))
 
     def attach_image(self, filename: AnyStr, data: bytes, description: Optional[AnyStr] = None):
         """Attach an image file to this step that will then be available in generated reports."""
@@ -329,7 +396,8 @@ class Step:
         if filename is None:
             raise ValueError("Must provide filename for images (for now).")
 
-        self.last_attachments().append(Attachment('image', filename, data, description))
+        media_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        self.last_attachments().append(Attachment.store('image', filename, data, media_type, description))
 
 
 class Scenario:
@@ -347,16 +415,80 @@ class Scenario:
 
         if self.is_from_outline:
             self.line_in_file: AnyStr = raw_pickle['locations']['scenario_outline']['line']
+            self.example_line_in_file: Optional[int] = raw_pickle['locations']['example_values']['line']
         else:
             self.line_in_file: AnyStr = raw_pickle['locations']['scenario']['line']
+            self.example_line_in_file: Optional[int] = None
 
-        self.steps: List[Step] = self.__process_steps(raw_pickle['steps'])
+        self.index: int = raw_pickle['index']
+        self.__raw_pickle: Dict = raw_pickle
+        self.__steps: Optional[List[Step]] = None
         self.tags: Dict[AnyStr, List[AnyStr]] = self.__process_tags(raw_pickle['tags'])
         self.repeat_count: int = -1
         self.results: List[Dict[AnyStr, Any]] = []
         self.__increment()
         self.overall_result: Optional[AnyStr] = None
 
+    def __getstate__(self):
+        # the context is re-attached by `Feature.set_context` after unpickling
+        state = self.__dict__.copy()
+        state['context_ref'] = None
+        return state
+
+    @property
+    def steps(self) -> List[Step]:
+        """
+        Steps are created and bound on first access, so that scenarios removed by tag filters never render or bind them.
+        Raises `StepNotFoundError` if a step has no step definition.
+        """
+        if self.__steps is None:
+            self.__steps = self.__process_steps(pickle_steps(self.__raw_pickle))
+        return self.__steps
+
+    @property
+    def raw_pickle(self) -> Dict:
+        """Compiled pickle the scenario was created from, e.g. to create the same scenario in a worker process without parsing"""
+        return self.__raw_pickle
+
+    def set_context(self, context_ref: Context):
+        self.context_ref = context_ref
+        for step in self.__steps or []:
+            step.context_ref = context_ref
+
+    def result_record(self) -> Dict[AnyStr, Any]:
+        """Compact summary of the scenario results which is cheap to send to another process, see `apply_result_record`"""
+        return {
+            'index': self.index,
+            'identifiers': self.identifiers,
+            'execution_times_ns': [results['execution_time_ns'] for results in self.results],
+            'overall_result': self.overall_result,
+            'steps': [step.result_record() for step in self.steps],
+        }
+
+    def apply_result_record(self, record: Dict[AnyStr, Any]):
+        """Update the scenario and its steps with results executed elsewhere, see `result_record`"""
+        self.identifiers = record['identifiers']
+        self.repeat_count = len(self.identifiers) - 1
+        self.overall_result = record['overall_result']
+        for step, step_record in zip(self.steps, record['steps']):
+            step.apply_result_record(step_record)
+        self.results = []
+        for repeat, execution_time_ns in enumerate(record['execution_times_ns']):
+            results = {
+                'passed_steps': [],
+                'failed_steps': [],
+                'not_executed_steps': [],
+                'execution_time_ns': execution_time_ns,
+            }
+            for step in self.steps:
+                if step.results[repeat]['status'] == STATUS_PASSED:
+                    results['passed_steps'].append(step)
+                elif step.results[repeat]['status'] == STATUS_FAILED:
+                    results['failed_steps'].append(step)
+                elif step.results[repeat]['status'] == STATUS_NOT_EXECUTED:
+                    results['not_executed_steps'].append(step)
+            self.results.append(results)
+
     def last_id(self) -> str:
         return self.identifiers[self.repeat_count]
 
@@ -397,12 +529,27 @@ class Scenario:
 
     def execute_steps(self) -> None:
         self.__execute_steps()
-        while self.overall_result == STATUS_FAILED and self.repeat_count < self.context_ref.get_options().failed_repeat_count:
+        while self.__should_repeat():
             for step in self.steps:
                 step.increment()
             self.__increment()
             self.__execute_steps()
 
+    def __should_repeat(self) -> bool:
+        return self.overall_result == STATUS_FAILED and self.repeat_count < self.context_ref.get_options().failed_repeat_count
+
+    def __event_data(self) -> Dict[AnyStr, Any]:
+        return {
+            'uri': self.uri,
+            'feature_name': self.feature_name,
+            'scenario_index': self.index,
+            'scenario_id': self.last_id(),
+            'name': self.name,
+            'line': self.line_in_file,
+            'example_line': self.example_line_in_file,
+            'repeat': self.repeat_count,
+        }
+
     def __execute_steps(self) -> None:
         self.__update_context()
         l.ttrace(f"executing 'before_scenario'...")
@@ -411,11 +558,19 @@ class Scenario:
         l.ttrace(f"setting log handler...")
         logger.set_scenario_handler(self.last_id())
 
-        l.ttrace(f"executing steps of scenario '{self.name}'...")
+        l.ttrace("executing steps of scenario '%s'...", self.name)
+        events.emit('scenario_started', **self.__event_data(), step_count=len(self.steps))
         start = time.perf_counter_ns()
 
-        for step in self.steps:
+        for i, step in enumerate(self.steps):
+            events.emit('step_started', **self.__event_data(), step_index=i, step_id=step.last_id(), keyword=step.keyword, text=step.text)
             step.execute_step()
+            step_results = step.last_results()
+            events.emit('step_finished', **self.__event_data(), step_index=i, step_id=step.last_id(),
+                        status=step_results['status'], execution_time_ns=step_results['execution_time_ns'],
+                        exception_name=step_results['exception']['name'] if step_results['exception'] is not None else None,
+                        exception_args=_simple_args(step_results['exception']['args']) if step_results['exception'] is not None else None,
+                        attachments=[dict(vars(attachment)) for attachment in step.last_attachments()])
             if step.results[step.repeat_count]['status'] == STATUS_FAILED:
                 break
         l.ttrace(f"gathering steps results...")
@@ -438,6 +593,9 @@ class Scenario:
 
         l.ttrace(f"executing 'after_scenario'...")
         after_scenario.execute(self.context_ref, self)
+        events.emit('scenario_finished', **self.__event_data(), status=self.overall_result, execution_time_ns=end - start,
+                    final=not self.__should_repeat(), step_count=len(self.steps),
+                    not_executed_steps=len(self.results[self.repeat_count]['not_executed_steps']))
 
 
 class ScenarioOutline:
@@ -454,33 +612,52 @@ class ScenarioOutline:
         self.overall_result: Optional[AnyStr] = None
 
     def execute_scenarios(self):
-        l.ttrace(f"executing scenarios of scenario outline '{self.raw_name}'...")
+        l.ttrace("executing scenarios of scenario outline '%s'...", self.raw_name)
         start = time.perf_counter_ns()
         for scenario in self.scenarios:
             scenario.execute_steps()
-            l.ttrace(f"gathering scenario results...")
-            if len(scenario.results[scenario.repeat_count]['failed_steps']) == 0:
+        end = time.perf_counter_ns()
+        self.gather_results(end - start)
+
+    def gather_results(self, execution_time_ns: int):
+        """Sort executed scenarios by their result and update the overall status, scenarios which never ran are skipped"""
+        l.ttrace(f"gathering scenario results...")
+        self.results['passed_scenarios'] = []
+        self.results['failed_scenarios'] = []
+        for scenario in self.scenarios:
+            if _skip_if_not_executed(scenario):
+                self.results['skipped_scenarios'].append(scenario)
+            elif len(scenario.results[scenario.repeat_count]['failed_steps']) == 0:
                 self.results['passed_scenarios'].append(scenario)
             else:
                 self.results['failed_scenarios'].append(scenario)
-        end = time.perf_counter_ns()
-        self.results['execution_time_ns'] = end - start
-        if len(self.scenarios) == len(self.results['passed_scenarios']):
-            self.overall_result = STATUS_PASSED
-        else:
+        self.results['execution_time_ns'] = execution_time_ns
+        if len(self.results['failed_scenarios']) > 0:
             self.overall_result = STATUS_FAILED
+        elif len(self.results['passed_scenarios']) == 0:
+            self.overall_result = STATUS_SKIPPED
+        else:
+            self.overall_result = STATUS_PASSED
 
 
 class Feature:
-    def __init__(self, file_path, context_ref: Context):
+    def __init__(self, file_path, context_ref: Context, pickles: Optional[List[Dict]] = None):
+        """
+        Parse the feature file, or create the feature from `pickles` which were already parsed and selected elsewhere,
+        see `Scenario.raw_pickle`.
+        """
         self.context_ref: Context = context_ref
-        parsed = self.__parse_feature_file(file_path)
-        self.scenarios: List[Scenario] = parsed[0]
-        self.scenario_outlines: List[ScenarioOutline] = parsed[1]
-        self.name: AnyStr = self.scenarios[0].feature_name if len(self.scenarios) > 0 else self.scenario_outlines[0].scenarios[
-            0].feature_name
-        self.uri: Optional[AnyStr] = None
+        self.uri: AnyStr = file_path
+        if pickles is None:
+            pickles, skipped_pickles = self.__parse_feature_file(file_path)
+        else:
+            skipped_pickles = []
+        self.name: AnyStr = (pickles + skipped_pickles)[0]['feature_name']
+        self.scenarios: List[Scenario]
+        self.scenario_outlines: List[ScenarioOutline]
+        self.scenarios, self.scenario_outlines = self.__build_scenarios(pickles)
         self.identifier = _generate_id()
+        self.__scenarios_by_index: Optional[Dict[int, Scenario]] = None
         self.results: Dict[AnyStr, Any] = {
             'passed_scenarios': [],
             'failed_scenarios': [],
@@ -491,24 +668,67 @@ class Feature:
             'execution_time_ns': None,
         }
         self.overall_result: Optional[AnyStr] = None
+        self.__skip_scenarios(skipped_pickles)
 
-    def __parse_feature_file(self, path: AnyStr) -> Tuple[List[Scenario], List[ScenarioOutline]]:
-        """Run gherkin parser on a file"""
-        with open(path, "r") as f:
-            data = f.read()
-
-        gherkin_document = Parser().parse(data)
-        pickles = compile(gherkin_document)
-
-        if len(pickles) == 0:
-            raise EmptyFeatureError("Empty feature is not allowed.")
+    def __parse_feature_file(self, path: AnyStr) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Run gherkin parser on a file, or load the pickles from the parse cache.
+        Returns pickles matching the tag expressions from options and the pickles which do not, the latter without steps.
+        Pickles outside of the line selection from options are left out.
+        """
+        options = self.context_ref.get_options()
+        tag_filter = _tag_filter(options.tag_expressions)
+        lines = options.line_selection.get(path)
+        skipped: List[Dict] = []
+        if options.parse_cache or lines is not None:
+            # cached pickles are compiled for all tags, and lines are selected among all pickles
+            if options.parse_cache:
+                pickles = load_pickles(path)
+            else:
+                with open(path, "rb") as f:
+                    pickles = parse_pickles(f.read())
+            if len(pickles) == 0:
+                raise EmptyFeatureError("Empty feature is not allowed.")
+            if lines is not None:
+                pickles = _select_lines(pickles, lines)
+            if tag_filter is not None:
+                matches = [tag_filter(_tag_names(pickle['tags'])) for pickle in pickles]
+                skipped = [skipped_pickle(pickle) for pickle, match in zip(pickles, matches) if not match]
+                pickles = [pickle for pickle, match in zip(pickles, matches) if match]
+        else:
+            with open(path, "rb") as f:
+                pickles = parse_pickles(f.read(), tag_filter, skipped)
+            if len(pickles) + len(skipped) == 0:
+                raise EmptyFeatureError("Empty feature is not allowed.")
 
-        all_scenarios: List[Scenario] = []
-        for pickle in pickles:
-            self.uri = path
+        for i, pickle in enumerate(pickles + skipped):
             pickle['uri'] = path
-            # print(json.dumps(pickle, indent=2, sort_keys=False))
-            all_scenarios.append(Scenario(pickle, self.context_ref))
+            pickle['index'] = i
+        return pickles, skipped
+
+    def __skip_scenarios(self, pickles: List[Dict]):
+        """
+        Record scenarios which did not match the tag expressions as skipped, the same way pruning by tags does.
+        Their pickles have no steps, so they need no step definitions.
+        """
+        outlines: Dict[AnyStr, ScenarioOutline] = {f"[L{o.scenarios[0].line_in_file}] {o.scenarios[0].raw_name}": o
+                                                   for o in self.scenario_outlines}
+        for scenario in [Scenario(pickle, self.context_ref) for pickle in pickles]:
+            l.ttrace("skipping scenario '%s' with tags %s", scenario.name, scenario.tags)
+            scenario.overall_result = STATUS_SKIPPED
+            if not scenario.is_from_outline:
+                self.results['skipped_scenarios'].append(scenario)
+                continue
+            key = f"[L{scenario.line_in_file}] {scenario.raw_name}"
+            if key not in outlines:
+                outlines[key] = ScenarioOutline(key, [])
+                outlines[key].overall_result = STATUS_SKIPPED
+                self.results['skipped_scenario_outlines'].append(outlines[key])
+            outlines[key].results['skipped_scenarios'].append(scenario)
+
+    def __build_scenarios(self, pickles: List[Dict]) -> Tuple[List[Scenario], List[ScenarioOutline]]:
+        """Create pure scenarios and scenario outlines from pickles"""
+        all_scenarios: List[Scenario] = [Scenario(pickle, self.context_ref) for pickle in pickles]
 
         pure_scenarios: List[Scenario] = []
         clustered_scenarios: Dict[AnyStr, List[Scenario]] = {}
@@ -527,25 +747,36 @@ class Feature:
         for raw_name, scenarios in clustered_scenarios.items():
             scenario_outlines.append(ScenarioOutline(raw_name, scenarios))
 
-        l.ttrace(f"pure scenarios: {pure_scenarios}")
-        l.ttrace(f"clustered scenarios: {clustered_scenarios}")
-        l.ttrace(f"scenario outlines: {scenario_outlines}")
+        l.ttrace("pure scenarios: %s", pure_scenarios)
+        l.ttrace("clustered scenarios: %s", clustered_scenarios)
+        l.ttrace("scenario outlines: %s", scenario_outlines)
 
         return pure_scenarios, scenario_outlines
 
+    def set_context(self, context_ref: Context):
+        """Point the feature, its scenarios and steps to a context, e.g. after the feature was parsed in another process."""
+        self.context_ref = context_ref
+        for scenario in self.scenarios + [s for scenario_outline in self.scenario_outlines for s in scenario_outline.scenarios]:
+            scenario.set_context(context_ref)
+
+    def bind_steps(self):
+        """Create and bind steps of all scenarios which were not filtered out, see `Scenario.steps`"""
+        for position in self.positions():
+            self.scenario_at(position).steps
+
     def __update_context(self):
         l.ttrace("updating context feature data...")
         self.context_ref.set_feature(self)
 
     def prune_by_flat_tags(self, expr):
         """Flatten the tag levels into one and remove all steps that do not match with given expression"""
-        l.ttrace(f"pruning '{self.name}'")
+        l.ttrace("pruning '%s'", self.name)
         pruned_scenarios: List[Scenario] = []
         for scenario in self.scenarios:
             if expr.evaluate(_flatten_tags(scenario.tags)):
                 pruned_scenarios.append(scenario)
             else:
-                l.ttrace(f"pruning scenario with tags {scenario.tags}")
+                l.ttrace("pruning scenario with tags %s", scenario.tags)
                 scenario.overall_result = STATUS_SKIPPED
                 self.results['skipped_scenarios'].append(scenario)
         self.scenarios = pruned_scenarios
@@ -557,13 +788,11 @@ class Feature:
                 if expr.evaluate(_flatten_tags(scenario.tags)):
                     pruned_scenarios.append(scenario)
                 else:
-                    l.ttrace(
-                        f"pruning scenario '{scenario.name}' from examples table '{scenario.examples_name}' with"
-                        f"tags {scenario.tags} in scenario outline '{scenario_outline.raw_name}'"
-                    )
+                    l.ttrace("pruning scenario '%s' from examples table '%s' with tags %s in scenario outline '%s'",
+                             scenario.name, scenario.examples_name, scenario.tags, scenario_outline.raw_name)
                     scenario.overall_result = STATUS_SKIPPED
                     scenario_outline.results['skipped_scenarios'].append(scenario)
-            if len(scenario_outline.scenarios) == len(scenario_outline.results['skipped_scenarios']):
+            if len(pruned_scenarios) == 0:
                 self.results['skipped_scenario_outlines'].append(scenario_outline)
                 scenario_outline.overall_result = STATUS_SKIPPED
             else:
@@ -571,19 +800,20 @@ class Feature:
             scenario_outline.scenarios = pruned_scenarios
 
         self.scenario_outlines = pruned_scenario_outlines
+        self.__scenarios_by_index = None
 
         if len(self.scenarios) == 0 and len(self.scenario_outlines) == 0:
             self.overall_result = STATUS_SKIPPED
 
     def prune_by_tag_level(self, expr, level: AnyStr):
         """Remove all steps that do not match with given expression for a given tag level"""
-        l.ttrace(f"pruning '{self.name}'")
+        l.ttrace("pruning '%s'", self.name)
         pruned_scenarios: List[Scenario] = []
         for scenario in self.scenarios:
             if expr.evaluate(scenario.tags[level]):
                 pruned_scenarios.append(scenario)
             else:
-                l.ttrace(f"pruning scenario with tags {scenario.tags}")
+                l.ttrace("pruning scenario with tags %s", scenario.tags)
                 self.results['skipped_scenarios'].append(scenario)
                 self.results['skipped_pure_scenarios'].append(scenario)
         self.scenarios = pruned_scenarios
@@ -594,73 +824,183 @@ class Feature:
                 if expr.evaluate(scenario.tags[level]):
                     pruned_scenarios.append(scenario)
                 else:
-                    l.ttrace(
-                        f"pruning scenario '{scenario.name}' from examples table '{scenario.examples_name}' with"
-                        f"tags {scenario.tags} in scenario outline '{scenario_outline.raw_name}'"
-                    )
+                    l.ttrace("pruning scenario '%s' from examples table '%s' with tags %s in scenario outline '%s'",
+                             scenario.name, scenario.examples_name, scenario.tags, scenario_outline.raw_name)
                     scenario_outline.results['skipped_scenarios'].append(scenario)
-            if len(scenario_outline.scenarios) == len(scenario_outline.results['skipped_scenarios']):
+            if len(pruned_scenarios) == 0:
                 self.results['skipped_scenario_outlines'].append(scenario_outline)
             scenario_outline.scenarios = pruned_scenarios
+        self.__scenarios_by_index = None
 
         if len(self.scenarios) == 0 and len(self.scenario_outlines) == 0:
             self.overall_result = STATUS_SKIPPED
 
-    def execute_scenarios(self):
+    def scenario_at(self, position: Tuple[Optional[int], int]) -> Scenario:
+        """Returns a pure scenario `(None, index)` or a scenario of a scenario outline `(outline_index, index)`"""
+        outline_index, index = position
+        if outline_index is None:
+            return self.scenarios[index]
+        return self.scenario_outlines[outline_index].scenarios[index]
+
+    def scenario_by_index(self, index: int) -> Scenario:
+        """Returns a scenario by its index among all scenarios compiled from the feature file"""
+        if self.__scenarios_by_index is None:
+            self.__scenarios_by_index = {self.scenario_at(position).index: self.scenario_at(position) for position in self.positions()}
+        return self.__scenarios_by_index[index]
+
+    def positions(self) -> List[Tuple[Optional[int], int]]:
+        """Returns positions of all pure scenarios followed by positions of all scenarios from scenario outlines"""
+        result: List[Tuple[Optional[int], int]] = [(None, i) for i in range(len(self.scenarios))]
+        for outline_index, scenario_outline in enumerate(self.scenario_outlines):
+            result.extend((outline_index, i) for i in range(len(scenario_outline.scenarios)))
+        return result
+
+    def start_execution(self):
         _register_environment()  # register again because of parallelism
         self.__update_context()
         l.ttrace(f"executing 'before_feature'...")
         before_feature.execute(self.context_ref, self)
+        events.emit('feature_started', uri=self.uri, feature_name=self.name)
+
+    def finish_execution(self):
+        l.ttrace(f"executing 'after_feature'...")
+        after_feature.execute(self.context_ref, self)
+        events.emit('feature_finished', uri=self.uri, feature_name=self.name)
+
+    def execute_scenarios(self):
+        self.start_execution()
 
         start = time.perf_counter_ns()
 
-        l.ttrace(f"executing scenarios of feature '{self.name}'...")
+        l.ttrace("executing scenarios of feature '%s'...", self.name)
         for scenario in self.scenarios:
-            l.ttrace(f"executing scenario '{scenario.name}'")
+            l.ttrace("executing scenario '%s'", scenario.name)
             scenario.execute_steps()
 
-        l.ttrace(f"executing scenario outlines of feature '{self.name}'...")
+        l.ttrace("executing scenario outlines of feature '%s'...", self.name)
         for scenario_outline in self.scenario_outlines:
-            l.ttrace(f"executing scenario outline '{scenario_outline.raw_name}'")
+            l.ttrace("executing scenario outline '%s'", scenario_outline.raw_name)
             scenario_outline.execute_scenarios()
 
         end = time.perf_counter_ns()
-        self.results['execution_time_ns'] = end - start
+        self.gather_results(end - start, gather_outlines=False)
+
+        self.finish_execution()
+
+    def gather_results(self, execution_time_ns: int, gather_outlines: bool = True):
+        """
+        Sort executed scenarios and scenario outlines by their result and update the overall status.
+        If `gather_outlines` is set, results of the scenario outlines are gathered as well, e.g. when their scenarios were executed separately.
+        """
+        self.results['execution_time_ns'] = execution_time_ns
 
         l.ttrace(f"gathering results from scenarios...")
+        self.results['passed_scenarios'] = []
+        self.results['failed_scenarios'] = []
         for scenario in self.scenarios:
-            if len(scenario.results[scenario.repeat_count]['failed_steps']) == 0:
+            if _skip_if_not_executed(scenario):
+                self.results['skipped_scenarios'].append(scenario)
+            elif len(scenario.results[scenario.repeat_count]['failed_steps']) == 0:
                 self.results['passed_scenarios'].append(scenario)
             else:
                 self.results['failed_scenarios'].append(scenario)
 
         l.ttrace(f"gathering results from scenario outlines...")
+        self.results['passed_scenario_outlines'] = []
+        self.results['failed_scenario_outlines'] = []
         for scenario_outline in self.scenario_outlines:
-            if len(scenario_outline.results['passed_scenarios']) == len(scenario_outline.scenarios):
+            if gather_outlines:
+                scenario_outline.gather_results(sum(scenario.results[r]['execution_time_ns'] or 0
+                                                    for scenario in scenario_outline.scenarios
+                                                    for r in range(scenario.repeat_count + 1)))
+            if scenario_outline.overall_result == STATUS_SKIPPED:
+                self.results['skipped_scenario_outlines'].append(scenario_outline)
+            elif scenario_outline.overall_result == STATUS_PASSED:
                 self.results['passed_scenario_outlines'].append(scenario_outline)
             else:
                 self.results['failed_scenario_outlines'].append(scenario_outline)
 
         l.ttrace(f"updating overall status...")
         if len(self.scenarios) > 0 or len(self.scenario_outlines) > 0:
-            if len(self.scenarios) == len(self.results['passed_scenarios']) and \
-                    len(self.scenario_outlines) == len(self.results['passed_scenario_outlines']):
-                self.overall_result = STATUS_PASSED
-            else:
+            if len(self.results['failed_scenarios']) > 0 or len(self.results['failed_scenario_outlines']) > 0:
                 self.overall_result = STATUS_FAILED
+            elif len(self.results['passed_scenarios']) == 0 and len(self.results['passed_scenario_outlines']) == 0:
+                self.overall_result = STATUS_SKIPPED
+            else:
+                self.overall_result = STATUS_PASSED
 
-        l.ttrace(f"executing 'after_feature'...")
-        after_feature.execute(self.context_ref, self)
+
+def _select_lines(pickles: List[Dict], lines: Set[int]) -> List[Dict]:
+    """
+    Returns pickles located at any of the lines, a line of a scenario outline or of examples selects all their example rows.
+    Raises `LineNotFoundError` if there is no scenario, scenario outline, examples or example row at some of the lines.
+    """
+    selected = []
+    found: Set[int] = set()
+    for pickle in pickles:
+        pickle_lines = {location['line'] for location in pickle['locations'].values()} & lines
+        if len(pickle_lines) > 0:
+            selected.append(pickle)
+            found.update(pickle_lines)
+    if found != lines:
+        raise LineNotFoundError(f"No scenario, scenario outline, examples or example row at line(s) {', '.join(str(line) for line in sorted(lines - found))}.")
+    return selected
+
+
+def _tag_names(raw_tags: Dict) -> Dict[AnyStr, List[AnyStr]]:
+    return {level: [raw_tag['name'] for raw_tag in raw_tags[level]] for level in raw_tags}
+
+
+def _tag_filter(tag_expressions: Dict[AnyStr, AnyStr]) -> Optional[Callable[[Dict[AnyStr, List[AnyStr]]], bool]]:
+    """
+    Returns a function telling whether tags of a scenario (tag names by tag level) match all tag expressions,
+    or `None` if there are no tag expressions.
+    """
+    expressions = [(level, cucumber_tag_expressions.TagExpressionParser.parse(expression))
+                   for level, expression in tag_expressions.items() if expression != ""]
+    if len(expressions) == 0:
+        return None
+
+    def matches(tags: Dict[AnyStr, List[AnyStr]]) -> bool:
+        return all(expression.evaluate(_flatten_tags(tags) if level == 'flat' else tags[level]) for level, expression in expressions)
+
+    return matches
 
 
 def _flatten_tags(tags: Dict[AnyStr, List[AnyStr]]) -> List[AnyStr]:
     flat_tags: Set[AnyStr] = set()
     for tag_level in tags.values():
         flat_tags = flat_tags.union(set(tag_level))
-    l.ttrace(f"tags: {flat_tags}")
+    l.ttrace("tags: %s", flat_tags)
     return list(flat_tags)
 
 
+def _skip_if_not_executed(scenario: Scenario) -> bool:
+    """Mark a scenario which was never executed, e.g. because the run was cancelled, as skipped"""
+    if scenario.overall_result is None or scenario.overall_result == STATUS_SKIPPED:
+        scenario.overall_result = STATUS_SKIPPED
+        return True
+    return False
+
+
+def _compact_step_results(results: Dict[AnyStr, Any]) -> Dict[AnyStr, Any]:
+    """Replace the exception object in step results by its name and args, which are reduced to simple types"""
+    results = dict(results)
+    if results['exception'] is not None:
+        results['exception'] = {
+            'name': results['exception']['name'],
+            'args': _simple_args(results['exception']['args']),
+            'exception': None,
+            'execution_time_ns': results['exception']['execution_time_ns'],
+        }
+    return results
+
+
+def _simple_args(args: Tuple) -> Tuple:
+    """Reduce exception args to simple types, so that they can be sent between processes and serialized"""
+    return tuple(arg if isinstance(arg, (str, int, float, bool, type(None))) else repr(arg) for arg in args)
+
+
 def _register_environment():
     """Import environment so that decorators on them run and the before/after functions are registered."""
     importlib.import_module('environment')
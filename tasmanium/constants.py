@@ -1,6 +1,8 @@
 FEATURES_PATH = "./features"
 STEPS_PATH = "./steps"
 
+STEP_BINDING_CACHE_SIZE = 4096
+
 STATUS_PASSED = 'passed'
 STATUS_FAILED = 'failed'
 STATUS_SKIPPED = 'skipped'
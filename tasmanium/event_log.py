@@ -0,0 +1,53 @@
+import glob
+import heapq
+import json
+import os
+import shutil
+from typing import Any, AnyStr, Dict, Iterator
+
+from tasmanium import logger
+
+l = logger.getLogger(__name__)
+
+EVENT_LOG_PATH = f"{logger.LOGFILE_PATH}/events"
+
+
+def clear():
+    """Remove event logs of the previous run"""
+    shutil.rmtree(EVENT_LOG_PATH, ignore_errors=True)
+
+
+class EventLog:
+    """
+    Execution event listener appending events of the current process to an NDJSON file, one event per line.
+    Events forwarded from other processes are left out, those processes write their own files.
+    The file is flushed whenever a scenario or a feature finishes.
+    """
+
+    def __init__(self, name: AnyStr):
+        os.makedirs(EVENT_LOG_PATH, exist_ok=True)
+        self.path: AnyStr = f"{EVENT_LOG_PATH}/{name}.ndjson"
+        self.pid: int = os.getpid()
+        self.file = open(self.path, "a", encoding='utf-8')
+        l.ttrace("writing execution events to '%s'", self.path)
+
+    def __call__(self, event: Dict[AnyStr, Any]):
+        if event['pid'] != self.pid:
+            return
+        self.file.write(json.dumps(event, default=repr) + "\n")
+        if event['type'] in ('scenario_finished', 'feature_finished', 'run_finished'):
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def read_events(path: AnyStr = EVENT_LOG_PATH) -> Iterator[Dict[AnyStr, Any]]:
+    """Yields events from all event log files of a run, merged in the order of their timestamps"""
+    def read(file_path: AnyStr) -> Iterator[Dict[AnyStr, Any]]:
+        with open(file_path, "r", encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+    yield from heapq.merge(*(read(file_path) for file_path in sorted(glob.glob(f"{path}/*.ndjson"))),
+                           key=lambda event: event['timestamp_ns'])
@@ -0,0 +1,30 @@
+import os
+import time
+from typing import Any, AnyStr, Callable, Dict, List
+
+# Execution events (scenario/step started and finished) are plain dicts with a 'type' key,
+# so that worker processes can forward them to the parent as they are.
+listeners: List[Callable[[Dict[AnyStr, Any]], None]] = []
+
+
+def add_listener(listener: Callable[[Dict[AnyStr, Any]], None]):
+    listeners.append(listener)
+
+
+def remove_listener(listener: Callable[[Dict[AnyStr, Any]], None]):
+    listeners.remove(listener)
+
+
+def emit(event_type: AnyStr, **data):
+    """Create an event and pass it to all listeners. Does nothing if nobody listens."""
+    if len(listeners) == 0:
+        return
+    event = {'type': event_type, 'timestamp_ns': time.time_ns(), 'pid': os.getpid()}
+    event.update(data)
+    publish(event)
+
+
+def publish(event: Dict[AnyStr, Any]):
+    """Pass an already created event to all listeners, e.g. an event forwarded from a worker process."""
+    for listener in list(listeners):
+        listener(event)
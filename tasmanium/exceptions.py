@@ -12,3 +12,15 @@ class StepNotFoundError(Exception):
 
 class EmptyFeatureError(Exception):
     pass
+
+
+class LineNotFoundError(Exception):
+    pass
+
+
+class FeatureParseError(Exception):
+    pass
+
+
+class WorkerError(Exception):
+    pass
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+from typing import Any, AnyStr, Callable, Dict, List, Optional
+
+from tasmanium import logger
+from tasmanium.gherkin.pickles.compiler import pickle_steps
+from tasmanium.parse_cache import CACHE_PATH, load_pickles
+
+l = logger.getLogger(__name__)
+
+INDEX_PATH = f"{CACHE_PATH}/index.json"
+# bump whenever the index entry format changes
+INDEX_FORMAT_VERSION = 1
+
+
+def load_index() -> Dict[AnyStr, Dict[AnyStr, Any]]:
+    try:
+        with open(INDEX_PATH, "r") as f:
+            index = json.load(f)
+    except (OSError, ValueError) as e:
+        l.ttrace(f"no feature index loaded: {e}")
+        return {}
+    if index.get('version') != INDEX_FORMAT_VERSION:
+        return {}
+    return index['files']
+
+
+def save_index(index: Dict[AnyStr, Dict[AnyStr, Any]]):
+    os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+    tmp_path = f"{INDEX_PATH}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump({'version': INDEX_FORMAT_VERSION, 'files': index}, f)
+        os.replace(tmp_path, INDEX_PATH)
+    except OSError as e:
+        l.warning(f"could not save feature index '{INDEX_PATH}': {e}")
+
+
+def _index_entry(path: AnyStr, stat: os.stat_result, content_hash: AnyStr) -> Dict[AnyStr, Any]:
+    pickles = load_pickles(path)
+    scenarios = []
+    for pickle in pickles:
+        locations = pickle['locations']
+        scenarios.append({
+            'name': pickle['name'],
+            'line': locations['scenario_outline']['line'] if 'scenario_outline' in locations else locations['scenario']['line'],
+            'example_line': locations['example_values']['line'] if 'example_values' in locations else None,
+            'tags': {level: [tag['name'] for tag in tags] for level, tags in pickle['tags'].items()},
+            'steps': [step['text'] for step in pickle_steps(pickle)],
+        })
+    return {
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha256': content_hash,
+        'feature_name': pickles[0]['feature_name'] if len(pickles) > 0 else None,
+        'scenarios': scenarios,
+    }
+
+
+def update_index(index: Dict[AnyStr, Dict[AnyStr, Any]], file_paths: List[AnyStr]) -> int:
+    """
+    Bring index entries of given feature files up to date, returns the number of changed entries, so that the index is saved if it is not 0.
+    Files are re-parsed only if their mtime or size changed and so did their content,
+    entries of files whose content did not change just get the new mtime and size.
+    Files which fail to parse get a `None` entry.
+    """
+    updated = 0
+    for path in file_paths:
+        stat = os.stat(path)
+        entry = index.get(path)
+        if entry is not None and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            continue
+
+        with open(path, "rb") as f:
+            content_hash = hashlib.sha256(f.read()).hexdigest()
+        if entry is not None and entry['sha256'] == content_hash:
+            entry['mtime_ns'], entry['size'] = stat.st_mtime_ns, stat.st_size
+            updated += 1
+            continue
+
+        l.ttrace(f"indexing '{path}'...")
+        try:
+            index[path] = _index_entry(path, stat, content_hash)
+        except Exception as e:
+            l.warning(f"could not index '{path}': {type(e).__name__}: {e}")
+            index[path] = None
+        updated += 1
+
+    for path in [path for path in index if not os.path.exists(path)]:
+        del index[path]
+        updated += 1
+    return updated
+
+
+def select_files(index: Dict[AnyStr, Dict[AnyStr, Any]], file_paths: List[AnyStr],
+                 tag_filter: Callable[[Dict[AnyStr, List[AnyStr]]], bool]) -> List[AnyStr]:
+    """
+    Returns feature files having at least one scenario matching the tag filter.
+    Files which could not be indexed or have no scenarios are always returned, so that their errors are reported when they are parsed.
+    """
+    selected: List[AnyStr] = []
+    for path in file_paths:
+        entry: Optional[Dict[AnyStr, Any]] = index.get(path)
+        if entry is None or len(entry['scenarios']) == 0 or any(tag_filter(scenario['tags']) for scenario in entry['scenarios']):
+            selected.append(path)
+    return selected
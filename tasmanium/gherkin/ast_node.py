@@ -1,23 +1,23 @@
-from collections import defaultdict
-
-
 class AstNode(object):
+    __slots__ = ('rule_type', '_sub_items')
 
     def __init__(self, rule_type):
         self.rule_type = rule_type
-        self._sub_items = defaultdict(list)
+        # plain dict, most nodes hold only a few of all the possible rule types
+        self._sub_items = {}
 
     def add(self, rule_type, obj):
-        self._sub_items[rule_type].append(obj)
+        self._sub_items.setdefault(rule_type, []).append(obj)
 
     def get_single(self, rule_type):
-        return self._sub_items[rule_type][0] if self._sub_items[rule_type] else None
+        items = self._sub_items.get(rule_type)
+        return items[0] if items else None
 
     def get_items(self, rule_type):
-        return self._sub_items[rule_type]
+        return self._sub_items.get(rule_type, [])
 
     def get_token(self, token_type):
         return self.get_single(token_type)
 
     def get_tokens(self, token_type):
-        return self._sub_items[token_type]
+        return self._sub_items.get(token_type, [])
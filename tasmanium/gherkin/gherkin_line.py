@@ -1,4 +1,6 @@
 class GherkinLine(object):
+    __slots__ = ('_line_text', '_line_number', '_trimmed_line_text', 'indent')
+
     def __init__(self, line_text, line_number):
         self._line_text = line_text
         self._line_number = line_number
@@ -35,8 +37,23 @@ class GherkinLine(object):
         """
         An iterator returning all the table cells in a row with their positions,
         accounting for escaping.
+        Rows without a backslash are simply split on '|', only escaped rows are walked char by char.
         """
+        if '\\' in row:
+            return self.split_escaped_table_cells(row)
+        return self.split_plain_table_cells(row)
+
+    @staticmethod
+    def split_plain_table_cells(row):
+        cells = row.split('|')
+        # content before the first | and after the last | is skipped
+        start_col = len(cells[0]) + 2
+        for cell in cells[1:-1]:
+            yield (cell, start_col)
+            start_col += len(cell) + 1
 
+    @staticmethod
+    def split_escaped_table_cells(row):
         row = iter(row)
         col = 0
         start_col = col + 1
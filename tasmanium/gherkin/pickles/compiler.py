@@ -3,7 +3,13 @@ import re
 from gherkin.count_symbols import count_symbols
 
 
-def compile(gherkin_document):
+def compile(gherkin_document, expand_outlines=True, tag_filter=None, skipped=None):
+    """
+    Compile a gherkin document into pickles, one per scenario and one per example row of scenario outlines.
+    Unless `expand_outlines` is set, steps of example rows are not rendered, see `pickle_steps`.
+    `tag_filter` is called with tag names by tag level, steps of scenarios and examples tables it rejects are not compiled at all.
+    If `skipped` is a list, the rejected scenarios and example rows are appended to it as pickles without steps.
+    """
     pickles = []
     if 'feature' not in gherkin_document:
         return pickles
@@ -18,26 +24,47 @@ def compile(gherkin_document):
         if scenario_definition['type'] is 'Background':
             background_steps = _pickle_steps(scenario_definition)
         elif scenario_definition['type'] is 'Scenario':
-            _compile_scenario(*args)
+            _compile_scenario(*args, tag_filter, skipped)
         else:
-            _compile_scenario_outline(*args)
+            _compile_scenario_outline(*args, expand_outlines, tag_filter, skipped)
     return pickles
 
 
-def _compile_scenario(feature_name, feature_tags, background_steps, scenario, language, pickles):
-    steps = list()
-    if len(scenario['steps']) > 0:
-        steps.extend(background_steps)
+def pickle_steps(pickle):
+    """Returns steps of a pickle, example rows compiled without `expand_outlines` are rendered from their outline template"""
+    if 'steps' in pickle:
+        return pickle['steps']
+
+    template, values = pickle['template'], pickle['values']
+    steps = list(template['background_steps'])
+    for step in template['steps']:
+        steps.append({
+            'keyword': step['keyword'],
+            'text': _render(step['text'], values),
+            'raw_text': step['raw_text'],
+            'arguments': _render_arguments(step['arguments'], values),
+            'locations': {
+                "example_values": dict(pickle['locations']['example_values']),
+                "scenario_outline_step": dict(step['location'])
+            }
+        })
+    return steps
+
+
+def skipped_pickle(pickle):
+    """Returns a copy of a pickle without steps, like the ones `compile` records for scenarios rejected by the tag filter"""
+    skipped = {key: value for key, value in pickle.items() if key not in ('steps', 'template', 'values')}
+    skipped['steps'] = []
+    return skipped
 
+
+def _compile_scenario(feature_name, feature_tags, background_steps, scenario, language, pickles, tag_filter=None, skipped=None):
     tags = {
         'feature_level': list(feature_tags),
         'scenario_level': list(scenario['tags']),
         'example_level': [],
     }
 
-    for step in scenario['steps']:
-        steps.append(_pickle_step(step))
-
     pickle = {
         'feature_name': feature_name,
         # 'tags': _pickle_tags(tags),
@@ -45,110 +72,172 @@ def _compile_scenario(feature_name, feature_tags, background_steps, scenario, la
         'name': scenario['name'],
         'language': language,
         'locations': {'scenario': _pickle_location(scenario['location'])},
-        'steps': steps
     }
+    if tag_filter is not None and not tag_filter(_tag_names(tags)):
+        if skipped is not None:
+            pickle['steps'] = []
+            skipped.append(pickle)
+        return
+
+    steps = list()
+    if len(scenario['steps']) > 0:
+        steps.extend(background_steps)
+    for step in scenario['steps']:
+        steps.append(_pickle_step(step))
+    pickle['steps'] = steps
     pickles.append(pickle)
 
 
-def _compile_scenario_outline(feature_name, feature_tags, background_steps, scenario_outline, language, pickles):
+def _compile_scenario_outline(feature_name, feature_tags, background_steps, scenario_outline, language, pickles, expand_outlines=True,
+                              tag_filter=None, skipped=None):
     for examples in (e for e in scenario_outline['examples'] if 'tableHeader' in e):
+        table_tags = {
+            'feature_level': feature_tags,
+            'scenario_level': scenario_outline['tags'],
+            'example_level': examples['tags'],
+        }
+        rejected = tag_filter is not None and not tag_filter(_tag_names(table_tags))
+        if rejected and skipped is None:
+            continue
+
         variable_cells = examples['tableHeader']['cells']
+        # templates are tokenized once per examples table, every row is then rendered by joining
+        placeholders = _placeholders(variable_cells)
+        name_template = _tokenize(scenario_outline['name'], placeholders)
+        template = None if rejected else {
+            'background_steps': background_steps if len(scenario_outline['steps']) > 0 else [],
+            'steps': [{
+                'keyword': step['keyword'].strip(),
+                'text': _tokenize(step['text'], placeholders),
+                'raw_text': step['text'],
+                'arguments': _argument_template(step.get('argument'), placeholders),
+                'location': _pickle_step_location(step),
+            } for step in scenario_outline['steps']],
+        }
 
         for values in examples['tableBody']:
-            value_cells = values['cells']
-            steps = list()
-            if len(scenario_outline['steps']) > 0:
-                steps.extend(background_steps)
-            tags = {
-                'feature_level': list(feature_tags),
-                'scenario_level': list(scenario_outline['tags']),
-                'example_level': list(examples['tags']),
-            }
-
-            for scenario_outline_step in scenario_outline['steps']:
-                step_text = _interpolate(
-                    scenario_outline_step['text'],
-                    variable_cells,
-                    value_cells)
-                arguments = _create_pickle_arguments(
-                    scenario_outline_step.get('argument'),
-                    variable_cells,
-                    value_cells)
-                _pickle_step = {
-                    'keyword': scenario_outline_step['keyword'].strip(),
-                    'text': step_text,
-                    'raw_text': scenario_outline_step['text'],
-                    'arguments': arguments,
-                    'locations': {
-                        "example_values": _pickle_location(values['location']),
-                        "scenario_outline_step": _pickle_step_location(scenario_outline_step)
-                    }
-                }
-                steps.append(_pickle_step)
-
+            row_values = [cell['value'] for cell in values['cells']]
             pickle = {
                 'feature_name': feature_name,
-                'name': _interpolate(
-                    scenario_outline['name'],
-                    variable_cells,
-                    value_cells),
+                'name': _render(name_template, row_values),
                 'raw_name': scenario_outline['name'],
                 'examples_name': examples['name'],
                 'language': language,
-                'steps': steps,
                 # 'tags': _pickle_tags(tags),
-                'tags': tags,
+                'tags': {level: list(tags) for level, tags in table_tags.items()},
                 'locations': {
                     'example_values': _pickle_location(values['location']),
+                    'examples': _pickle_location(examples['location']),
                     'scenario_outline': _pickle_location(scenario_outline['location']),
                 }
             }
+            if rejected:
+                pickle['steps'] = []
+                skipped.append(pickle)
+                continue
+
+            # the template is shared by all rows of the examples table
+            pickle['template'], pickle['values'] = template, row_values
+            if expand_outlines:
+                pickle['steps'] = pickle_steps(pickle)
+                del pickle['template'], pickle['values']
             pickles.append(pickle)
 
 
 def _create_pickle_arguments(argument, variables, values):
-    result = []
+    return _render_arguments(_argument_template(argument, _placeholders(variables)), [cell['value'] for cell in values])
+
 
+def _argument_template(argument, placeholders):
+    """Step argument with all interpolated strings tokenized, see `_tokenize`"""
     if not argument:
+        return None
+
+    if argument['type'] == 'DataTable':
+        return {
+            'type': argument['type'],
+            'rows': [[(_pickle_location(cell['location']), _tokenize(cell['value'], placeholders), cell['value'])
+                      for cell in row['cells']]
+                     for row in argument['rows']],
+        }
+
+    elif argument['type'] == 'DocString':
+        return {
+            'type': argument['type'],
+            'location': _pickle_location(argument['location']),
+            'content': _tokenize(argument['content'], placeholders),
+            'contentType': _tokenize(argument['contentType'], placeholders) if 'contentType' in argument else None,
+        }
+
+    else:
+        raise Exception('Internal error')
+
+
+def _render_arguments(template, values):
+    result = []
+
+    if not template:
         return result
 
-    if argument['type'] is 'DataTable':
+    if template['type'] == 'DataTable':
         table = {'rows': []}
-        for row in argument['rows']:
+        for row in template['rows']:
             cells = [
                 {
-                    'location': _pickle_location(cell['location']),
-                    'value': _interpolate(cell['value'], variables, values),
-                    'raw_value': cell['value']
-                } for cell in row['cells']
+                    'location': dict(location),
+                    'value': _render(value, values),
+                    'raw_value': raw_value
+                } for location, value, raw_value in row
             ]
             table['rows'].append({'cells': cells})
         result.append(table)
 
-    elif argument['type'] is 'DocString':
+    else:
         docstring = {
-            'location': _pickle_location(argument['location']),
-            'content': _interpolate(argument['content'], variables, values)
+            'location': dict(template['location']),
+            'content': _render(template['content'], values)
         }
-        if 'contentType' in argument:
-            docstring['contentType'] = _interpolate(argument['contentType'], variables, values)
+        if template['contentType'] is not None:
+            docstring['contentType'] = _render(template['contentType'], values)
         result.append(docstring)
 
-    else:
-        raise Exception('Internal error')
-
     return result
 
 
-def _interpolate(name, variable_cells, value_cells):
+def _placeholders(variable_cells):
+    """
+    Returns a regex matching `<variable>` for all header cells and a map of variable names to their columns.
+    If a header is repeated, its first column is used.
+    """
+    columns = {}
     for n, variable_cell in enumerate(variable_cells):
-        value_cell = value_cells[n]
-        name = re.sub(
-            u'<{0[value]}>'.format(variable_cell),
-            value_cell['value'],
-            name
-        )
-    return name
+        columns.setdefault(variable_cell['value'], n)
+    if not columns:
+        return None, columns
+    return re.compile(u'<({0})>'.format(u'|'.join(re.escape(name) for name in columns))), columns
+
+
+def _tokenize(text, placeholders):
+    """Split a template into literal strings and column indices of the placeholders"""
+    pattern, columns = placeholders
+    if pattern is None:
+        return [text]
+    segments = []
+    position = 0
+    for match in pattern.finditer(text):
+        if match.start() > position:
+            segments.append(text[position:match.start()])
+        segments.append(columns[match.group(1)])
+        position = match.end()
+    if position < len(text) or not segments:
+        segments.append(text[position:])
+    return segments
+
+
+def _render(segments, values):
+    if len(segments) == 1 and not isinstance(segments[0], int):
+        return segments[0]
+    return u''.join(values[segment] if isinstance(segment, int) else segment for segment in segments)
 
 
 def _pickle_steps(scenario_definition):
@@ -182,6 +271,10 @@ def _pickle_location(location):
     }
 
 
+def _tag_names(tags):
+    return {level: [tag['name'] for tag in level_tags] for level, level_tags in tags.items()}
+
+
 def _pickle_tags(tags):
     return [_pickle_tag(tag) for tag in tags]
 
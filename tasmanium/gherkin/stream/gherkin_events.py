@@ -1,11 +1,11 @@
-from gherkin.errors import ParserError, CompositeParserException
-from gherkin.parser import Parser
-from gherkin.pickles.compiler import compile
+from ..errors import ParserError, CompositeParserException
+from ..parser import Parser
+from ..pickles.compiler import compile, pickle_steps
 
 
-def add_errors(events, errors, uri):
+def error_events(errors, uri):
     for error in errors:
-        events.append({
+        yield {
             'type': 'attachment',
             'source': {
                 'uri': uri,
@@ -19,7 +19,7 @@ def add_errors(events, errors, uri):
                 'encoding': 'utf-8',
                 'type': 'text/x.cucumber.stacktrace+plain'
             }
-        })
+        }
 
 
 class GherkinEvents:
@@ -28,35 +28,39 @@ class GherkinEvents:
         self.parser = Parser()
 
     def enum(self, source_event):
+        """
+        Yields the source, gherkin document and pickle events of a source event, as selected by options.
+        Steps of example rows are rendered only when their pickle event is yielded.
+        """
         uri = source_event['uri']
         source = source_event['data']
 
-        events = []
-
         try:
             gherkin_document = self.parser.parse(source)
-
-            if (self.options.print_source):
-                events.append(source_event)
-
-            if (self.options.print_ast):
-                events.append({
-                    'type': 'gherkin-document',
-                    'uri': uri,
-                    'document': gherkin_document
-                })
-
-            if (self.options.print_pickles):
-                pickles = compile(gherkin_document)
-                for pickle in pickles:
-                    events.append({
-                        'type': 'pickle',
-                        'uri': uri,
-                        'pickle': pickle
-                    })
         except CompositeParserException as e:
-            add_errors(events, e.errors, uri)
+            yield from error_events(e.errors, uri)
+            return
         except ParserError as e:
-            add_errors(events, [e], uri)
+            yield from error_events([e], uri)
+            return
+
+        if self.options.print_source:
+            yield source_event
 
-        return events
+        if self.options.print_ast:
+            yield {
+                'type': 'gherkin-document',
+                'uri': uri,
+                'document': gherkin_document
+            }
+
+        if self.options.print_pickles:
+            for pickle in compile(gherkin_document, expand_outlines=False):
+                if 'template' in pickle:
+                    pickle['steps'] = pickle_steps(pickle)
+                    del pickle['template'], pickle['values']
+                yield {
+                    'type': 'pickle',
+                    'uri': uri,
+                    'pickle': pickle
+                }
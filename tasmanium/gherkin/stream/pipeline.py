@@ -0,0 +1,44 @@
+import multiprocessing as mp
+from collections import deque
+
+from .gherkin_events import GherkinEvents
+from .source_events import SourceEvents, source_event
+
+
+class StreamOptions:
+    def __init__(self, print_source=True, print_ast=True, print_pickles=True):
+        self.print_source = print_source
+        self.print_ast = print_ast
+        self.print_pickles = print_pickles
+
+
+def file_events(path, options):
+    """All events of a single feature file, used by worker processes which have to send them back at once"""
+    return list(GherkinEvents(options).enum(source_event(path)))
+
+
+def stream_events(paths, options, processes=1):
+    """
+    Yields source, gherkin document and pickle events file by file, in the order of `paths`.
+    With more processes, files are parsed by a worker pool with at most two files per worker in flight,
+    so memory stays bounded by a few files no matter how slowly the events are consumed.
+    """
+    if processes <= 1 or len(paths) <= 1:
+        gherkin_events = GherkinEvents(options)
+        for event in SourceEvents(paths).enum():
+            yield from gherkin_events.enum(event)
+        return
+
+    with mp.Pool(min(processes, len(paths))) as pool:
+        pending = deque()
+        paths = iter(paths)
+        for path in paths:
+            pending.append(pool.apply_async(file_events, (path, options)))
+            if len(pending) >= processes * 2:
+                break
+        while len(pending) > 0:
+            events = pending.popleft().get()
+            path = next(paths, None)
+            if path is not None:
+                pending.append(pool.apply_async(file_events, (path, options)))
+            yield from events
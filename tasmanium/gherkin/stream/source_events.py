@@ -1,17 +1,16 @@
-import io
-
-
 def source_event(path):
-    event = {
+    """Read a feature file into a source event, the file is closed right away"""
+    with open(path, 'r', encoding='utf8', newline='') as f:
+        data = f.read()
+    return {
         'type': 'source',
         'uri': path,
-        'data': io.open(path, 'rU', encoding='utf8', newline='').read(),
+        'data': data,
         'media': {
             'encoding': 'utf-8',
             'type': 'text/x.cucumber.gherkin+plain'
         }
     }
-    return event
 
 
 class SourceEvents:
@@ -19,4 +18,6 @@ class SourceEvents:
         self.paths = paths
 
     def enum(self):
-        return map(source_event, self.paths)
+        """Yields source events one file at a time, so only a single file is held in memory"""
+        for path in self.paths:
+            yield source_event(path)
@@ -1,7 +1,12 @@
 class Token(object):
+    __slots__ = ('line', 'location', 'keywords', 'matched_type', 'matched_text', 'matched_keyword', 'matched_indent',
+                 'matched_items', 'matched_gherkin_dialect')
+
     def __init__(self, gherkin_line, location):
         self.line = gherkin_line
         self.location = location
+        # (dialect name, (step keyword, title keyword)), cached by the token matcher
+        self.keywords = None
 
     def eof(self):
         return not self.line
@@ -19,20 +19,19 @@ class TokenMatcher(object):
         self._active_doc_string_separator = None
 
     def match_FeatureLine(self, token):
-        return self._match_title_line(token, 'FeatureLine', self.dialect.feature_keywords)
+        return self._match_title_line(token, 'FeatureLine')
 
     def match_ScenarioLine(self, token):
-        return self._match_title_line(token, 'ScenarioLine', self.dialect.scenario_keywords)
+        return self._match_title_line(token, 'ScenarioLine')
 
     def match_ScenarioOutlineLine(self, token):
-        return self._match_title_line(token, 'ScenarioOutlineLine',
-                                      self.dialect.scenario_outline_keywords)
+        return self._match_title_line(token, 'ScenarioOutlineLine')
 
     def match_BackgroundLine(self, token):
-        return self._match_title_line(token, 'BackgroundLine', self.dialect.background_keywords)
+        return self._match_title_line(token, 'BackgroundLine')
 
     def match_ExamplesLine(self, token):
-        return self._match_title_line(token, 'ExamplesLine', self.dialect.examples_keywords)
+        return self._match_title_line(token, 'ExamplesLine')
 
     def match_TableRow(self, token):
         if not token.line.startswith('|'):
@@ -42,17 +41,13 @@ class TokenMatcher(object):
         return True
 
     def match_StepLine(self, token):
-        keywords = (self.dialect.given_keywords +
-                    self.dialect.when_keywords +
-                    self.dialect.then_keywords +
-                    self.dialect.and_keywords +
-                    self.dialect.but_keywords)
-        for keyword in (k for k in keywords if token.line.startswith(k)):
-            title = token.line.get_rest_trimmed(len(keyword))
-            self._set_token_matched(token, 'StepLine', title, keyword)
-            return True
-
-        return False
+        keyword = self._classify(token)[0]
+        if keyword is None:
+            return False
+
+        title = token.line.get_rest_trimmed(len(keyword))
+        self._set_token_matched(token, 'StepLine', title, keyword)
+        return True
 
     def match_Comment(self, token):
         if not token.line.startswith('#'):
@@ -125,13 +120,31 @@ class TokenMatcher(object):
         self._set_token_matched(token, 'EOF')
         return True
 
-    def _match_title_line(self, token, token_type, keywords):
-        for keyword in (k for k in keywords if token.line.startswith_title_keyword(k)):
-            title = token.line.get_rest_trimmed(len(keyword) + len(':'))
-            self._set_token_matched(token, token_type, title, keyword)
-            return True
+    def _match_title_line(self, token, token_type):
+        keyword = self._classify(token)[1]
+        if keyword is None or token_type not in self._title_keywords[keyword]:
+            return False
 
-        return False
+        title = token.line.get_rest_trimmed(len(keyword) + len(':'))
+        self._set_token_matched(token, token_type, title, keyword)
+        return True
+
+    def _classify(self, token):
+        """
+        Find the step keyword and the title keyword the line starts with, both may be None.
+        The parser tries several matchers on the same line, so the result is cached on the token.
+        """
+        if token.keywords is not None and token.keywords[0] == self.dialect_name:
+            return token.keywords[1]
+
+        text = token.line.get_line_text()
+        match = self._step_keyword_re.match(text)
+        step_keyword = match.group(0) if match else None
+        title_keyword = text.partition(':')[0] if ':' in text else None
+        if title_keyword not in self._title_keywords:
+            title_keyword = None
+        token.keywords = (self.dialect_name, (step_keyword, title_keyword))
+        return token.keywords[1]
 
     def _set_token_matched(self, token, matched_type, text=None,
                            keyword=None, indent=None, items=None):
@@ -157,5 +170,23 @@ class TokenMatcher(object):
         self.dialect_name = dialect_name
         self.dialect = dialect
 
+        # alternatives are tried in order, so the first matching keyword wins as before
+        step_keywords = (dialect.given_keywords +
+                         dialect.when_keywords +
+                         dialect.then_keywords +
+                         dialect.and_keywords +
+                         dialect.but_keywords)
+        self._step_keyword_re = re.compile('|'.join(re.escape(keyword) for keyword in step_keywords))
+
+        # title keywords are followed by ':', so the text before the first ':' is looked up
+        self._title_keywords = {}
+        for token_type, keywords in [('FeatureLine', dialect.feature_keywords),
+                                     ('ScenarioLine', dialect.scenario_keywords),
+                                     ('ScenarioOutlineLine', dialect.scenario_outline_keywords),
+                                     ('BackgroundLine', dialect.background_keywords),
+                                     ('ExamplesLine', dialect.examples_keywords)]:
+            for keyword in keywords:
+                self._title_keywords.setdefault(keyword, set()).add(token_type)
+
     def _unescaped_docstring(self, text):
         return text.replace('\\"\\"\\"', '"""') if self._active_doc_string_separator else text
@@ -19,27 +19,27 @@ class TokenScanner(object):
     """
 
     def __init__(self, path_or_str):
-        if os.path.exists(path_or_str):
-            self.io = io.open(path_or_str, 'rU', encoding='utf8')
+        # feature file content spans several lines, so only a single line string is probed as a path
+        if '\n' not in path_or_str and os.path.exists(path_or_str):
+            with io.open(path_or_str, 'r', encoding='utf8') as f:
+                text = f.read()
+        elif sys.version_info < (3, 0) and isinstance(path_or_str, str):
+            text = unicode(path_or_str, encoding='utf8')
         else:
-            if sys.version_info < (3, 0):
-                if isinstance(path_or_str, str):
-                    self.io = io.StringIO(unicode(path_or_str, encoding='utf8'))
-                else:
-                    self.io = io.StringIO(path_or_str)
-            else:
-                self.io = io.StringIO(path_or_str)
+            text = path_or_str
+        # the whole document is split at once, lines keep their '\n' like `readline` does
+        self.lines = text.split('\n')
+        self.last_line_index = len(self.lines) - 1
         self.line_number = 0
 
     def read(self):
         self.line_number += 1
         location = {'line': self.line_number, 'column': 0}
-        line = self.io.readline()
+        index = self.line_number - 1
+        if index < self.last_line_index:
+            line = self.lines[index] + '\n'
+        elif index == self.last_line_index:
+            line = self.lines[index]
+        else:
+            line = ''
         return Token((GherkinLine(line, self.line_number) if line else line), location)
-
-    def __del__(self):
-        # close file descriptor if it's still open
-        try:
-            self.io.close()
-        except AttributeError:
-            pass
@@ -5,7 +5,7 @@ from typing import List, Dict, AnyStr
 
 from Cheetah.Template import Template
 
-from tasmanium import logger
+from tasmanium import logger, attachment_store
 from tasmanium.boiled_pickle import Scenario, Feature
 
 l = logger.getLogger(__name__)
@@ -35,18 +35,16 @@ def generate_html_report(features: List[Feature], scenarios: List[Scenario], exc
             l.ttrace(f"copying scenario log '{path}'...")
             copy2(path, f"html_report/{scenario.identifiers[repeat]}/scenario.log")
 
-    l.ttrace(f"copying scenario attachments...")
+    l.ttrace(f"linking scenario attachments...")
     for scenario in scenarios:
         for repeat in range(scenario.repeat_count + 1):
             for step in scenario.steps:
                 for attachment in step.attachments[repeat]:
                     l.ttrace(
-                        f"copying attachment '{scenario.identifiers[repeat]}/{step.identifiers[repeat]}/{attachment.filename}'")
+                        f"linking attachment '{scenario.identifiers[repeat]}/{step.identifiers[repeat]}/{attachment.filename}'")
                     os.makedirs(f'html_report/{scenario.identifiers[repeat]}/{step.identifiers[repeat]}/', exist_ok=True)
-                    with open(
-                            f"html_report/{scenario.identifiers[repeat]}/{step.identifiers[repeat]}/{attachment.filename}",
-                            "wb") as f:
-                        f.write(attachment.data)
+                    attachment_store.link(attachment.path,
+                                          f"html_report/{scenario.identifiers[repeat]}/{step.identifiers[repeat]}/{attachment.filename}")
 
     for source_file in ['style.css', 'js.js']:
         copy2(f"{os.path.dirname(os.path.realpath(__file__))}/template/{source_file}", f"html_report/")
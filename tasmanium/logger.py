@@ -1,7 +1,11 @@
+import contextvars
 import datetime
-import inspect
 import logging
+import logging.handlers
 import os
+import queue
+import sys
+import threading
 
 import colorlog
 
@@ -16,6 +20,9 @@ LEVELS = {
     50: 'CRITICAL',
 }
 LOGGING_LEVEL = 'TTRACE'
+# records waiting to be written to scenario log files, steps block only when the writer falls this far behind
+SCENARIO_LOG_QUEUE_SIZE = 10000
+SCENARIO_LOG_BUFFER_SIZE = 65536
 loggers = {}
 
 logging.addLevelName(1, LEVELS[1])
@@ -51,28 +58,39 @@ def getLogger(name: str):
     logger = colorlog.getLogger(name)
 
     def lmw(msg, level, *args, **kwargs):
-        logger.log(msg=format_message(msg, inspect.currentframe().f_back.f_back.f_code, level), level=level, *args, **kwargs)
+        """Format and log the message, `args` are %-formatted into it only here, after the level was checked by the caller"""
+        if len(args) > 0:
+            msg = msg % args
+        logger.log(level, format_message(msg, sys._getframe(2).f_code, level), **kwargs)
 
+    # the level is checked before anything else, so disabled messages cost just a function call
     def ttrace(msg, *args, **kwargs):
-        lmw(msg, 1, *args, **kwargs)
+        if logger.isEnabledFor(1):
+            lmw(msg, 1, *args, **kwargs)
 
     def trace(msg, *args, **kwargs):
-        lmw(msg, 5, *args, **kwargs)
+        if logger.isEnabledFor(5):
+            lmw(msg, 5, *args, **kwargs)
 
     def debug(msg, *args, **kwargs):
-        lmw(msg, 10, *args, **kwargs)
+        if logger.isEnabledFor(10):
+            lmw(msg, 10, *args, **kwargs)
 
     def info(msg, *args, **kwargs):
-        lmw(msg, 20, *args, **kwargs)
+        if logger.isEnabledFor(20):
+            lmw(msg, 20, *args, **kwargs)
 
     def warning(msg, *args, **kwargs):
-        lmw(msg, 30, *args, **kwargs)
+        if logger.isEnabledFor(30):
+            lmw(msg, 30, *args, **kwargs)
 
     def error(msg, *args, **kwargs):
-        lmw(msg, 40, *args, **kwargs)
+        if logger.isEnabledFor(40):
+            lmw(msg, 40, *args, **kwargs)
 
     def critical(msg, *args, **kwargs):
-        lmw(msg, 50, *args, **kwargs)
+        if logger.isEnabledFor(50):
+            lmw(msg, 50, *args, **kwargs)
 
     logger.ttrace = ttrace
     logger.trace = trace
@@ -94,28 +112,123 @@ def set_global_level(level: str):
         logger.setLevel(level)
 
 
-current_scenario_handler = None
+class ScenarioRoutingHandler(logging.handlers.QueueHandler):
+    """
+    Installed once on the root logger, passes records to the scenario log sink along with the log file of the current scenario.
+    The scenario is taken from a context variable, so scenarios running in other threads or asyncio tasks get their own files.
+    Threads started by step code do not inherit the variable, their records go to the scenario running in the process
+    if there is just one. With several scenarios running at once, such threads have to be started
+    in a copy of the context (`contextvars.copy_context().run`) to be routed.
+    Records logged outside of any scenario are ignored.
+    """
+
+    def __init__(self):
+        super().__init__(None)
+
+    def emit(self, record):
+        path = current_scenario_log.get()
+        if path is None:
+            running = list(running_scenario_logs.values())
+            path = running[0] if len(running) == 1 else None
+        if path is None or self.queue is None:
+            return
+        try:
+            record = self.prepare(record)
+            record.scenario_log_path = path
+            # wait for the writer instead of dropping records if the queue is full
+            self.queue.put(record)
+        except Exception:
+            self.handleError(record)
+
+
+class ScenarioLogWriter(logging.Handler):
+    """
+    Writes records to scenario log files in the thread of the scenario log sink.
+    Files of running scenarios stay open with a large buffer until their scenario ends.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.files = {}
+
+    def emit(self, record):
+        if getattr(record, 'scenario_log_end', False):
+            file = self.files.pop(record.scenario_log_path, None)
+            if file is not None:
+                file.close()
+            return
+        file = self.files.get(record.scenario_log_path)
+        if file is None:
+            file = self.files[record.scenario_log_path] = open(record.scenario_log_path, "a", buffering=SCENARIO_LOG_BUFFER_SIZE)
+        file.write(record.msg + "\n")
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+        self.files.clear()
+        super().close()
+
+
+# log file of the scenario being executed in the current thread/task
+current_scenario_log = contextvars.ContextVar('current_scenario_log', default=None)
+# log files of scenarios running in this process by the thread executing them
+running_scenario_logs = {}
+scenario_routing_handler = ScenarioRoutingHandler()
+# (pid, listener) of the scenario log sink, it is started in each process which executes scenarios
+scenario_log_sink = None
+scenario_log_sink_lock = threading.Lock()
+
+
+def start_scenario_log_sink():
+    global scenario_log_sink
+    with scenario_log_sink_lock:
+        if scenario_log_sink is not None and scenario_log_sink[0] == os.getpid():
+            return
+        record_queue = queue.Queue(SCENARIO_LOG_QUEUE_SIZE)
+        listener = logging.handlers.QueueListener(record_queue, ScenarioLogWriter())
+        listener.start()
+        scenario_routing_handler.queue = record_queue
+        if scenario_routing_handler not in logging.root.handlers:
+            logging.root.addHandler(scenario_routing_handler)
+        scenario_log_sink = (os.getpid(), listener)
+
+
+def stop_scenario_log_sink():
+    """Write out all queued records and stop the writer thread"""
+    global scenario_log_sink
+    with scenario_log_sink_lock:
+        if scenario_log_sink is None or scenario_log_sink[0] != os.getpid():
+            return
+        listener = scenario_log_sink[1]
+        scenario_routing_handler.queue = None
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        scenario_log_sink = None
 
 
 def set_scenario_handler(scenario_identifier: str):
-    global current_scenario_handler
-    new_scenario_handler = logging.FileHandler(f"{LOGFILE_PATH}/scenarios/{scenario_identifier}.log")
-    for logger in loggers.values():
-        if current_scenario_handler is not None:
-            logger.handlers.remove(current_scenario_handler)
-        logger.addHandler(new_scenario_handler)
-    current_scenario_handler = new_scenario_handler
+    """Route records logged in the current thread/task to the log file of the scenario"""
+    start_scenario_log_sink()
+    path = f"{LOGFILE_PATH}/scenarios/{scenario_identifier}.log"
+    current_scenario_log.set(path)
+    running_scenario_logs[threading.get_ident()] = path
 
 
 def remove_scenario_handler():
-    global current_scenario_handler
-    for logger in loggers.values():
-        logger.handlers.remove(current_scenario_handler)
-    current_scenario_handler = None
+    """Stop routing records to the scenario log file, the sink closes it once all its records are written"""
+    path = current_scenario_log.get()
+    current_scenario_log.set(None)
+    running_scenario_logs.pop(threading.get_ident(), None)
+    if path is not None and scenario_routing_handler.queue is not None:
+        scenario_routing_handler.queue.put(logging.makeLogRecord({'scenario_log_path': path, 'scenario_log_end': True}))
 
 
 def set_verbosity(level: str):
+    global LOGGING_LEVEL
     if level not in LEVELS.values():
         raise ValueError(f"Invalid verbosity level '{level}'.")
+    # loggers created later get the level too
+    LOGGING_LEVEL = level
     for logger in loggers.values():
         logger.setLevel(level)
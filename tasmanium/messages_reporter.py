@@ -0,0 +1,184 @@
+import json
+import os
+import platform
+from typing import Any, AnyStr, Dict, List, Optional, Set
+
+from tasmanium import logger
+from tasmanium.constants import STATUS_PASSED, STATUS_FAILED
+from tasmanium.gherkin.stream.pipeline import StreamOptions, stream_events
+
+l = logger.getLogger(__name__)
+
+STATUSES = {STATUS_PASSED: 'PASSED', STATUS_FAILED: 'FAILED'}
+# version of the Cucumber Messages schema the envelopes follow
+PROTOCOL_VERSION = "19.1.2"
+
+
+def _timestamp(ns: int) -> Dict[AnyStr, int]:
+    return {'seconds': ns // 1000000000, 'nanos': ns % 1000000000}
+
+
+def _test_case_id(uri: AnyStr, line: int, example_line: Optional[int]) -> AnyStr:
+    """Test cases and their pickles are identified by the feature file and the line of the scenario or example row"""
+    return f"{uri}:{example_line or line}"
+
+
+def _pickle_step_argument(arguments: List[Dict[AnyStr, Any]]) -> Dict[AnyStr, Any]:
+    if len(arguments) == 0:
+        return {}
+    if 'rows' in arguments[0]:
+        return {'argument': {'dataTable': {'rows': [{'cells': [{'value': cell['value']} for cell in row['cells']]}
+                                                    for row in arguments[0]['rows']]}}}
+    doc_string = {'content': arguments[0]['content']}
+    if 'contentType' in arguments[0]:
+        doc_string['mediaType'] = arguments[0]['contentType']
+    return {'argument': {'docString': doc_string}}
+
+
+def _pickle_message(uri: AnyStr, pickle: Dict[AnyStr, Any]) -> Dict[AnyStr, Any]:
+    locations = pickle['locations']
+    line = locations['scenario_outline']['line'] if 'scenario_outline' in locations else locations['scenario']['line']
+    pickle_id = _test_case_id(uri, line, locations['example_values']['line'] if 'example_values' in locations else None)
+    return {
+        'id': pickle_id,
+        'uri': uri,
+        'name': pickle['name'],
+        'language': pickle['language'],
+        'steps': [dict({'id': f"{pickle_id}#step-{i}", 'text': step['text']}, **_pickle_step_argument(step['arguments']))
+                  for i, step in enumerate(pickle['steps'])],
+        'tags': [{'name': tag['name']} for tags in pickle['tags'].values() for tag in tags],
+    }
+
+
+class MessagesReporter:
+    """
+    Execution event listener writing Cucumber Messages as NDJSON while the tests run, one envelope per line.
+    When the run starts, the meta envelope and the source and pickle envelopes of `uris` are written first,
+    the feature files are parsed again by the gherkin stream pipeline for that. Only pickles in `pickle_ids` are written if given.
+    Gherkin documents are not written, the parser AST is not the one of the message schema, so pickles do not reference AST nodes.
+    Test cases and their pickles are identified by the feature file and the line of the scenario or example row,
+    every repeat of a failed scenario is another attempt of the same test case.
+    Steps which were not executed after a failed step are reported as skipped.
+    """
+
+    def __init__(self, path: AnyStr, uris: List[AnyStr], pickle_ids: Optional[Set[AnyStr]] = None):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.file = open(path, "w", encoding='utf-8')
+        self.uris: List[AnyStr] = uris
+        self.pickle_ids: Optional[Set[AnyStr]] = pickle_ids
+        self.failed: bool = False
+        self.__started_steps: Dict[AnyStr, Set[int]] = {}
+        l.ttrace("writing cucumber messages to '%s'", path)
+
+    def __write(self, message_type: AnyStr, message: Dict[AnyStr, Any]):
+        self.file.write(json.dumps({message_type: message}, default=repr) + "\n")
+
+    def __call__(self, event: Dict[AnyStr, Any]):
+        event_type = event['type']
+        if event_type == 'run_started':
+            self.__write_documents(event['parallel'])
+            self.__write('testRunStarted', {'timestamp': _timestamp(event['timestamp_ns'])})
+        elif event_type == 'scenario_started':
+            self.__scenario_started(event)
+        elif event_type == 'step_started':
+            self.__started_steps[event['scenario_id']].add(event['step_index'])
+            self.__write('testStepStarted', {
+                'testCaseStartedId': event['scenario_id'],
+                'testStepId': self.__test_step_id(event, event['step_index']),
+                'timestamp': _timestamp(event['timestamp_ns']),
+            })
+        elif event_type == 'step_finished':
+            self.__step_finished(event)
+        elif event_type == 'scenario_finished':
+            self.__scenario_finished(event)
+        elif event_type == 'run_finished':
+            self.__write('testRunFinished', {'success': not self.failed, 'timestamp': _timestamp(event['timestamp_ns'])})
+            self.file.flush()
+
+    def __write_documents(self, parallel: int):
+        self.__write('meta', {
+            'protocolVersion': PROTOCOL_VERSION,
+            'implementation': {'name': 'tasmanium'},
+            'runtime': {'name': platform.python_implementation(), 'version': platform.python_version()},
+            'os': {'name': platform.system(), 'version': platform.release()},
+            'cpu': {'name': platform.machine()},
+        })
+        for event in stream_events(self.uris, StreamOptions(print_ast=False), parallel):
+            if event['type'] == 'source':
+                self.__write('source', {'uri': event['uri'], 'data': event['data'], 'mediaType': event['media']['type']})
+            elif event['type'] == 'pickle':
+                pickle = _pickle_message(event['uri'], event['pickle'])
+                if self.pickle_ids is None or pickle['id'] in self.pickle_ids:
+                    self.__write('pickle', pickle)
+        self.file.flush()
+
+    @staticmethod
+    def __test_case_id(event: Dict[AnyStr, Any]) -> AnyStr:
+        return _test_case_id(event['uri'], event['line'], event['example_line'])
+
+    def __test_step_id(self, event: Dict[AnyStr, Any], step_index: int) -> AnyStr:
+        return f"{self.__test_case_id(event)}#{step_index}"
+
+    def __scenario_started(self, event: Dict[AnyStr, Any]):
+        test_case_id = self.__test_case_id(event)
+        self.__started_steps[event['scenario_id']] = set()
+        if event['repeat'] == 0:
+            self.__write('testCase', {
+                'id': test_case_id,
+                'pickleId': test_case_id,
+                'testSteps': [{'id': self.__test_step_id(event, i), 'pickleStepId': f"{test_case_id}#step-{i}"}
+                              for i in range(event['step_count'])],
+            })
+        self.__write('testCaseStarted', {
+            'id': event['scenario_id'],
+            'testCaseId': test_case_id,
+            'attempt': event['repeat'],
+            'timestamp': _timestamp(event['timestamp_ns']),
+        })
+
+    def __step_finished(self, event: Dict[AnyStr, Any]):
+        test_step_id = self.__test_step_id(event, event['step_index'])
+        for attachment in event['attachments']:
+            self.__write('attachment', {
+                'testCaseStartedId': event['scenario_id'],
+                'testStepId': test_step_id,
+                'mediaType': attachment['media_type'],
+                'fileName': attachment['filename'],
+                'url': f"file://{os.path.abspath(attachment['path'])}",
+                'body': "",
+                'contentEncoding': 'IDENTITY',
+            })
+        result = {
+            'status': STATUSES.get(event['status'], 'UNKNOWN'),
+            'duration': _timestamp(event['execution_time_ns'] or 0),
+        }
+        if event['exception_name'] is not None:
+            result['message'] = f"{event['exception_name']}: {', '.join(str(arg) for arg in event['exception_args'])}"
+        self.__write('testStepFinished', {
+            'testCaseStartedId': event['scenario_id'],
+            'testStepId': test_step_id,
+            'testStepResult': result,
+            'timestamp': _timestamp(event['timestamp_ns']),
+        })
+
+    def __scenario_finished(self, event: Dict[AnyStr, Any]):
+        started_steps = self.__started_steps.pop(event['scenario_id'])
+        timestamp = _timestamp(event['timestamp_ns'])
+        for i in range(event['step_count']):
+            if i in started_steps:
+                continue
+            self.__write('testStepStarted', {'testCaseStartedId': event['scenario_id'], 'testStepId': self.__test_step_id(event, i),
+                                             'timestamp': timestamp})
+            self.__write('testStepFinished', {
+                'testCaseStartedId': event['scenario_id'],
+                'testStepId': self.__test_step_id(event, i),
+                'testStepResult': {'status': 'SKIPPED', 'duration': _timestamp(0)},
+                'timestamp': timestamp,
+            })
+        if event['final'] and event['status'] == STATUS_FAILED:
+            self.failed = True
+        self.__write('testCaseFinished', {'testCaseStartedId': event['scenario_id'], 'timestamp': timestamp, 'willBeRetried': not event['final']})
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,85 @@
+import hashlib
+import io
+import marshal
+import os
+import sys
+from typing import AnyStr, Callable, Dict, List, Optional
+
+from tasmanium import logger
+from tasmanium.gherkin.parser import Parser
+from tasmanium.gherkin.pickles.compiler import compile
+
+l = logger.getLogger(__name__)
+
+CACHE_PATH = "./.tasmanium_cache"
+# bump whenever the compiled pickle format changes
+CACHE_FORMAT_VERSION = 4
+
+
+def _entry_path(path: AnyStr) -> AnyStr:
+    return f"{CACHE_PATH}/pickles/{hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()}.bin"
+
+
+def _read_entry(entry_path: AnyStr):
+    try:
+        with open(entry_path, "rb") as f:
+            entry = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(entry, tuple) or len(entry) != 6 or entry[0] != (CACHE_FORMAT_VERSION, sys.hexversion):
+        return None
+    return entry
+
+
+def _write_entry(entry_path: AnyStr, entry):
+    """Write the entry into a temporary file first, so that concurrent readers never see a partial entry."""
+    os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+    tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            marshal.dump(entry, f)
+        os.replace(tmp_path, entry_path)
+    except OSError as e:
+        l.warning(f"could not write parse cache entry '{entry_path}': {e}")
+
+
+def parse_document(raw: bytes) -> Dict:
+    """Run gherkin parser on raw feature file data"""
+    data = io.TextIOWrapper(io.BytesIO(raw)).read()  # decode the same way `open(path, "r")` does
+    return Parser().parse(data)
+
+
+def parse_pickles(raw: bytes, tag_filter: Optional[Callable[[Dict], bool]] = None, skipped: Optional[List[Dict]] = None) -> List[Dict]:
+    """
+    Run gherkin parser and pickle compiler on raw feature file data, steps of example rows are rendered later.
+    Scenarios rejected by `tag_filter` are not compiled, see `compile`.
+    """
+    return compile(parse_document(raw), expand_outlines=False, tag_filter=tag_filter, skipped=skipped)
+
+
+def load_pickles(path: AnyStr) -> List[Dict]:
+    """
+    Returns compiled pickles of a feature file, skipping gherkin parsing if the file did not change since the last run.
+    Cache entries are keyed by file path and validated by mtime and size, falling back to a content hash.
+    """
+    entry_path = _entry_path(path)
+    stat = os.stat(path)
+    entry = _read_entry(entry_path)
+    if entry is not None and entry[1] == os.path.abspath(path) and entry[2] == stat.st_mtime_ns and entry[3] == stat.st_size:
+        l.ttrace(f"parse cache hit for '{path}'")
+        return entry[5]
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    content_hash = hashlib.sha256(raw).hexdigest()
+
+    if entry is not None and entry[4] == content_hash:
+        l.ttrace(f"parse cache hit for '{path}' (content unchanged)")
+        pickles = entry[5]
+    else:
+        l.ttrace(f"parse cache miss for '{path}'")
+        pickles = parse_pickles(raw)
+
+    _write_entry(entry_path, ((CACHE_FORMAT_VERSION, sys.hexversion), os.path.abspath(path), stat.st_mtime_ns, stat.st_size,
+                              content_hash, pickles))
+    return pickles
@@ -0,0 +1,65 @@
+import sys
+from typing import Any, AnyStr, Dict, TextIO
+
+from tasmanium.constants import STATUS_PASSED, STATUS_FAILED
+
+# minimal time between two redraws of the progress line
+PROGRESS_REFRESH_NS = 100000000
+
+
+class Progress:
+    """
+    Execution event listener counting finished scenarios and steps as they arrive from workers.
+    Writes a live progress line if the output is a terminal.
+    """
+
+    def __init__(self, total_scenarios: int, output: TextIO = sys.stderr):
+        self.total_scenarios: int = total_scenarios
+        self.output: TextIO = output
+        self.live: bool = output.isatty()
+        self.counters: Dict[AnyStr, int] = {
+            'finished_scenarios': 0,
+            'passed_scenarios': 0,
+            'failed_scenarios': 0,
+            'repeated_scenarios': 0,
+            'passed_steps': 0,
+            'failed_steps': 0,
+            'not_executed_steps': 0,
+        }
+        self.__last_draw_ns: int = 0
+
+    def __call__(self, event: Dict[AnyStr, Any]):
+        if event['type'] == 'step_finished':
+            if event['status'] == STATUS_PASSED:
+                self.counters['passed_steps'] += 1
+            elif event['status'] == STATUS_FAILED:
+                self.counters['failed_steps'] += 1
+        elif event['type'] == 'scenario_finished':
+            if not event['final']:
+                self.counters['repeated_scenarios'] += 1
+                return
+            self.counters['finished_scenarios'] += 1
+            self.counters['not_executed_steps'] += event['not_executed_steps']
+            if event['status'] == STATUS_PASSED:
+                self.counters['passed_scenarios'] += 1
+            else:
+                self.counters['failed_scenarios'] += 1
+            self.__draw(event['timestamp_ns'], f"{event['feature_name']}: {event['name']}")
+
+    def line(self, last: AnyStr = "") -> AnyStr:
+        return (f"[{self.counters['finished_scenarios']}/{self.total_scenarios}] "
+                f"{self.counters['passed_scenarios']} passed, {self.counters['failed_scenarios']} failed"
+                + (f" | {last}" if last else ""))
+
+    def __draw(self, timestamp_ns: int, last: AnyStr):
+        finished = self.counters['finished_scenarios'] == self.total_scenarios
+        if not self.live or (timestamp_ns - self.__last_draw_ns < PROGRESS_REFRESH_NS and not finished):
+            return
+        self.__last_draw_ns = timestamp_ns
+        self.output.write(f"\r\033[K{self.line(last)}"[:200])
+        self.output.flush()
+
+    def close(self):
+        if self.live:
+            self.output.write(f"\r\033[K{self.line()}\n")
+            self.output.flush()
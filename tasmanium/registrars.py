@@ -2,21 +2,25 @@ from typing import Callable, AnyStr
 
 from tasmanium import logger
 from tasmanium.exceptions import SingletonError
+from tasmanium.step_matcher import StepMatcher
 
 l = logger.getLogger(__name__)
 
 
 def create_registrar():
     registry = {}
+    matcher = StepMatcher(registry)
 
     def registrar_with_arg(text: AnyStr):
         def registrar(func: Callable):
             registry[text] = func
+            matcher.invalidate()
             return func
 
         return registrar
 
     registrar_with_arg.all = registry
+    registrar_with_arg.matcher = matcher
     return registrar_with_arg
 
 
@@ -37,7 +41,7 @@ def singleton_registrar():
     def registrar(func: Callable):
         if len(function_ref) > 0:
             raise SingletonError("Cannot use singleton decorator twice.")
-        l.ttrace(f"binding func '{func.__name__}' to a singleton registrar")
+        l.ttrace("binding func '%s' to a singleton registrar", func.__name__)
         function_ref.append(func)
         return func
 
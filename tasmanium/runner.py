@@ -1,20 +1,33 @@
 import http.server
+import json
 import multiprocessing as mp
 import os
 import socketserver
-from typing import List, AnyStr, Dict, Any
+import sys
+import time
+from typing import List, AnyStr, Dict, Any, Optional, Tuple, TextIO, Collection
 
 import click
 import cucumber_tag_expressions
 
-from tasmanium import logger
-from tasmanium.boiled_pickle import Feature, _register_environment, Scenario, Context
+from tasmanium import logger, events, attachment_store, feature_index, event_log
+from tasmanium.boiled_pickle import Feature, _register_environment, Scenario, Context, binding_cache, _tag_filter
+from tasmanium.constants import STATUS_PASSED, STATUS_SKIPPED
+from tasmanium.exceptions import FeatureParseError, StepNotFoundError
+from tasmanium.gherkin.stream.pipeline import StreamOptions, stream_events
 from tasmanium.html_reporter.html_reporter import generate_html_report
+from tasmanium.messages_reporter import MessagesReporter, _test_case_id
+from tasmanium.progress import Progress
 from tasmanium.registrars import before_all, after_all
-from tasmanium.utils import _glob_feature_files_in_paths, _import_submodules
+from tasmanium.scheduler import Scheduler, build_work_units, PARALLEL_UNITS, UNIT_FEATURE
+from tasmanium.step_matcher import binding_stats, reset_binding_stats
+from tasmanium.timings import load_timings, save_timings, estimate_unit_durations
+from tasmanium.utils import _glob_feature_files_in_paths, _glob_feature_files_and_lines, _import_submodules
 
 l = logger.getLogger(__name__)
 
+STREAM_EVENT_TYPES = ('source', 'gherkin-document', 'pickle')
+
 
 def register_steps():
     """Import all steps so that decorators on them run and the step functions are registered."""
@@ -67,33 +80,106 @@ def filter_by_tags(features: List[Feature], summary: Dict[AnyStr, Any], user_fla
     return result
 
 
-def execute_feature(i, feature):
-    l.ttrace(f"executing feature '{feature.name}'...")
-    feature.execute_scenarios()
-    return i, feature
+def parse_feature(i: int, file_path: AnyStr, context: Context) -> Tuple[int, Optional[Feature], Optional[AnyStr]]:
+    """Parse a feature file, returning the feature or the error message."""
+    l.ttrace("parsing '%s'...", file_path)
+    feature, error = None, None
+    try:
+        feature = Feature(file_path, context)
+    except Exception as e:
+        l.error(f"failed to parse '{file_path}':", exc_info=e)
+        error = f"{file_path}: {type(e).__name__}: {e}"
+    return i, feature, error
+
+
+def parse_features(file_paths: List[AnyStr], context: Context, parallel: int) -> List[Feature]:
+    """
+    Parse feature files using up to `parallel` processes. Features are returned in the order of `file_paths`.
+    All files are parsed even if some of them fail, the errors are then raised together.
+    """
+    if parallel > 1 and len(file_paths) > 1:
+        chunk_size = max(1, len(file_paths) // (parallel * 4))
+        with mp.Pool(min(parallel, len(file_paths))) as pool:
+            results = list(pool.starmap(parse_feature, [(i, file_path, context) for i, file_path in enumerate(file_paths)], chunk_size))
+    else:
+        results = [parse_feature(i, file_path, context) for i, file_path in enumerate(file_paths)]
+
+    features: List[Feature] = []
+    errors: List[AnyStr] = []
+    for _, feature, error in sorted(results, key=lambda result: result[0]):
+        if error is not None:
+            errors.append(error)
+            continue
+        feature.set_context(context)
+        features.append(feature)
+
+    if len(errors) > 0:
+        raise FeatureParseError(f"Failed to parse {len(errors)} out of {len(file_paths)} feature files:\n" + "\n".join(errors))
+    return features
+
+
+def bind_steps(features: List[Feature]):
+    """
+    Bind steps of scenarios which were not filtered out to step definitions.
+    All features are bound even if some of them fail, the errors are then raised together.
+    """
+    reset_binding_stats()
+    binding_cache.clear()
+    errors: List[AnyStr] = []
+    for feature in features:
+        try:
+            feature.bind_steps()
+        except StepNotFoundError as e:
+            errors.append(f"{feature.uri}: {type(e).__name__}: {e}")
+
+    if len(errors) > 0:
+        raise FeatureParseError(f"Failed to bind steps of {len(errors)} out of {len(features)} features:\n" + "\n".join(errors))
+    l.debug(f"bound {binding_stats['bindings']} steps in {binding_stats['binding_time_ns'] / 1000000000:.3f}s "
+            f"({binding_stats['exact_matches']} exact matches, {binding_stats['pattern_attempts']} pattern attempts)")
 
 
 @click.command()
-@click.argument('command', type=click.Choice(['run', 'show-html']), nargs=1)
+@click.argument('command', type=click.Choice(['run', 'index', 'stream', 'show-html']), nargs=1)
 @click.option('--tags', 'user_flat_tag_expr', default="", show_default=True, help='Filter tests by tags using a tag expression.')
 @click.option('--feature-tags', 'user_feature_tag_expr', default="", show_default=True, help='Filter tests by feature tags.')
 @click.option('--scenario-tags', 'user_scenario_tag_expr', default="", show_default=True,
               help='Filter tests by scenario/scenario outline tags.')
 @click.option('--example-tags', 'user_example_tag_expr', default="", show_default=True, help='Filter tests by tags of example tables.')
-@click.option('--parallel', 'parallel', default=1, type=click.IntRange(1, 65535), show_default=True, help='Execute features in parallel.')
+@click.option('--parallel', 'parallel', default=1, type=click.IntRange(1, 65535), show_default=True, help='Parse and execute features in parallel.')
+@click.option('--parallel-unit', 'parallel_unit', default=UNIT_FEATURE, type=click.Choice(PARALLEL_UNITS), show_default=True,
+              help='Distribute whole features, scenario outlines or single scenarios among parallel workers.')
 @click.option('--log-level', 'log_level',
               type=click.Choice(['CRITICAL', 'ERROR', 'WARNING', 'INFO', 'DEBUG', 'TRACE', 'TTRACE'], case_sensitive=True),
               help='Set log level.')
 @click.option('--failed-repeat-count', 'failed_repeat_count', default=0, show_default=True, help='Repeat tests N times upon failure.')
+@click.option('--fail-fast', 'fail_fast', is_flag=True, default=False, help='Stop the run after the first failed scenario.')
+@click.option('--max-failures', 'max_failures', default=None, type=click.IntRange(1, None),
+              help='Stop the run after N failed scenarios, the remaining scenarios are skipped.')
+@click.option('--parse-cache/--no-parse-cache', 'parse_cache', default=True, show_default=True,
+              help='Reuse parsed feature files from the previous runs, select files by tags using the feature index.')
+@click.option('--timing-history/--no-timing-history', 'timing_history', default=True, show_default=True,
+              help='Start the longest features/scenarios first, based on their execution times from the previous runs.')
 @click.option('--html-report/--no-html-report', 'html_report', default=False, help='Generate a HTML report.')
+@click.option('--event-log/--no-event-log', 'event_log_enabled', default=False,
+              help='Write execution events of every process as NDJSON files into logs/events/.')
+@click.option('--messages-report', 'messages_report', default=None, type=click.Path(dir_okay=False),
+              help='Write Cucumber Messages NDJSON into this file while tests run.')
 @click.option('--port', 'port', default=6789, show_default=True, help='show-html: Run HTML report server on this port.')
+@click.option('--stream-events', 'stream_event_types', default=STREAM_EVENT_TYPES, multiple=True, type=click.Choice(STREAM_EVENT_TYPES),
+              show_default=True, help='stream: Types of gherkin events written to stdout as NDJSON.')
 @click.argument('feature_paths', nargs=-1)
 def click_parser(command, user_flat_tag_expr, user_feature_tag_expr, user_scenario_tag_expr, user_example_tag_expr, feature_paths, parallel,
-                 log_level, failed_repeat_count, html_report, port):
+                 parallel_unit, log_level, failed_repeat_count, fail_fast, max_failures, parse_cache, timing_history, html_report,
+                 event_log_enabled, messages_report, port, stream_event_types):
     """Tasmanium - a simple BDD framework."""
     if command == 'run':
         run(user_flat_tag_expr, user_feature_tag_expr, user_scenario_tag_expr, user_example_tag_expr, feature_paths, parallel, log_level,
-            failed_repeat_count, html_report)
+            failed_repeat_count, html_report, parse_cache, parallel_unit, timing_history, 1 if fail_fast else max_failures, event_log_enabled,
+            messages_report)
+    elif command == 'index':
+        index(feature_paths, log_level)
+    elif command == 'stream':
+        stream(feature_paths, stream_event_types, parallel, log_level)
     elif command == 'show-html':
         show_html(port)
     else:
@@ -101,6 +187,47 @@ def click_parser(command, user_flat_tag_expr, user_feature_tag_expr, user_scenar
         exit()
 
 
+def index(feature_paths="", log_level=None):
+    """Build or update the feature index, only feature files changed since the last indexing are parsed."""
+    if log_level is not None:
+        logger.set_verbosity(log_level)
+    file_paths = _glob_feature_files_in_paths(feature_paths if len(feature_paths) > 0 else ['.'])
+    files = feature_index.load_index()
+    updated = feature_index.update_index(files, file_paths)
+    feature_index.save_index(files)
+    scenario_count = sum(len(files[path]['scenarios']) for path in file_paths if files[path] is not None)
+    print(f"Indexed {len(file_paths)} feature files ({updated} updated) with {scenario_count} scenarios into '{feature_index.INDEX_PATH}'")
+
+
+def stream(feature_paths: Collection[AnyStr] = (), event_types: Collection[AnyStr] = STREAM_EVENT_TYPES, parallel=1, log_level=None,
+           output: TextIO = sys.stdout):
+    """Write source, gherkin document and pickle events of feature files as NDJSON, parsing the files one by one."""
+    if log_level is not None:
+        logger.set_verbosity(log_level)
+    file_paths = _glob_feature_files_in_paths(feature_paths if len(feature_paths) > 0 else ['.'])
+    options = StreamOptions('source' in event_types, 'gherkin-document' in event_types, 'pickle' in event_types)
+    for event in stream_events(file_paths, options, parallel):
+        output.write(json.dumps(event) + "\n")
+    output.flush()
+
+
+def select_indexed_files(file_paths: List[AnyStr], tag_expressions: Dict[AnyStr, AnyStr]) -> Tuple[List[AnyStr], int]:
+    """
+    Drop feature files without any scenario matching the tag expressions, using the feature index instead of parsing them.
+    Returns the remaining files and the number of dropped files, which are skipped features like features left empty by tags.
+    """
+    tag_filter = _tag_filter(tag_expressions)
+    if tag_filter is None:
+        return file_paths, 0
+    files = feature_index.load_index()
+    updated = feature_index.update_index(files, file_paths)
+    if updated > 0:
+        feature_index.save_index(files)
+    selected = feature_index.select_files(files, file_paths, tag_filter)
+    l.ttrace(f"feature index selected {len(selected)} out of {len(file_paths)} feature files ({updated} index entries updated)")
+    return selected, len(file_paths) - len(selected)
+
+
 def show_html(port: int):
     directory = "html_report"
 
@@ -114,29 +241,41 @@ def show_html(port: int):
 
 
 def run(user_flat_tag_expr="", user_feature_tag_expr="", user_scenario_tag_expr="", user_example_tag_expr="", feature_paths="", parallel=1,
-        log_level='TTRACE', failed_repeat_count=0, html_report=False):
+        log_level='TTRACE', failed_repeat_count=0, html_report=False, parse_cache=True, parallel_unit=UNIT_FEATURE, timing_history=True,
+        max_failures=None, event_log_enabled=False, messages_report=None):
     """Run feature files."""
     os.makedirs(f'logs/scenarios', exist_ok=True)
+    attachment_store.clear()
+    event_log.clear()
     if log_level is not None:
         logger.set_verbosity(log_level)
     context: Context = Context()
     context.get_options().failed_repeat_count = failed_repeat_count
+    context.get_options().parse_cache = parse_cache
+    context.get_options().event_log = event_log_enabled
+    context.get_options().tag_expressions = {
+        'flat': user_flat_tag_expr,
+        'feature_level': user_feature_tag_expr,
+        'scenario_level': user_scenario_tag_expr,
+        'example_level': user_example_tag_expr,
+    }
     l.ttrace(f"Resolving paths {feature_paths}...")
     if len(feature_paths) == 0:
         l.ttrace(f"No paths provided - resolving the entire 'features' directory.")
         feature_paths = ['.']
-    file_paths = _glob_feature_files_in_paths(feature_paths)
-    l.ttrace(f"Resolved paths: {file_paths}")
+    file_paths, line_selection = _glob_feature_files_and_lines(feature_paths)
+    l.ttrace(f"Resolved paths: {file_paths}, selected lines: {line_selection}")
+    context.get_options().line_selection = line_selection
+    dropped_file_count = 0
+    if parse_cache:
+        file_paths, dropped_file_count = select_indexed_files(file_paths, context.get_options().tag_expressions)
     context.files = file_paths
 
     register_steps()
     _register_environment()
 
-    features: List[Feature] = []
     l.ttrace(f"parsing feature files...")
-    for file_path in file_paths:
-        l.ttrace(f"parsing '{file_path}'...")
-        features.append(Feature(file_path, context))
+    features: List[Feature] = parse_features(file_paths, context, parallel)
 
     summary: Dict[AnyStr, Any] = {
         'passed_features': [],
@@ -156,9 +295,12 @@ def run(user_flat_tag_expr="", user_feature_tag_expr="", user_scenario_tag_expr=
         'skipped_steps': [],
         'not_executed_steps': [],
         'exception_groups': [],
+        # feature files dropped by the feature index, they are skipped features which were never parsed
+        'filtered_features': dropped_file_count,
     }
 
     features = filter_by_tags(features, summary, user_flat_tag_expr, user_feature_tag_expr, user_scenario_tag_expr, user_example_tag_expr)
+    bind_steps(features)
 
     l.ttrace("+--------------------------------------------------------------------------------------------------------------+")
     l.ttrace("|--------------------------------------------- ENTERING MEATSPACE ---------------------------------------------|")
@@ -167,11 +309,39 @@ def run(user_flat_tag_expr="", user_feature_tag_expr="", user_scenario_tag_expr=
     l.ttrace(f"executing 'before_all'...")
     before_all.execute(context)
 
-    l.ttrace(f"executing {len(features)} features...")
+    units = build_work_units(features, parallel_unit)
+    l.ttrace(f"executing {len(features)} features split into {len(units)} units by {parallel_unit}...")
     # mp.set_start_method('spawn')
 
-    for i, processed_feature in mp.Pool(parallel).starmap(execute_feature, zip([n for n in range(len(features))], features)):
-        features[i] = processed_feature
+    timings = load_timings() if timing_history else None
+    estimates = estimate_unit_durations(units, features, timings) if timing_history else None
+    progress = Progress(sum(len(unit.scenario_indices) for unit in units))
+    events.add_listener(progress)
+    run_log = event_log.EventLog('run') if event_log_enabled else None
+    reporter = None
+    if messages_report is not None:
+        scenarios = [feature.scenario_at(position) for feature in features for position in feature.positions()]
+        reporter = MessagesReporter(messages_report, [feature.uri for feature in features],
+                                    {_test_case_id(s.uri, s.line_in_file, s.example_line_in_file) for s in scenarios})
+    for listener in [run_log, reporter]:
+        if listener is not None:
+            events.add_listener(listener)
+    events.emit('run_started', feature_count=len(features), scenario_count=progress.total_scenarios, parallel=parallel,
+                parallel_unit=parallel_unit)
+    start = time.perf_counter_ns()
+    try:
+        Scheduler(features, context, units, parallel, estimates, max_failures).run()
+    finally:
+        events.emit('run_finished', execution_time_ns=time.perf_counter_ns() - start, counters=dict(progress.counters))
+        events.remove_listener(progress)
+        progress.close()
+        for listener in [run_log, reporter]:
+            if listener is not None:
+                events.remove_listener(listener)
+                listener.close()
+    l.debug(f"execution progress counters: {progress.counters}")
+    if timing_history:
+        save_timings(timings, features)
 
     l.ttrace(f"executing 'after_all'...")
     after_all.execute(context)
@@ -183,8 +353,9 @@ def run(user_flat_tag_expr="", user_feature_tag_expr="", user_scenario_tag_expr=
     l.ttrace(f"gathering data for summary...")
 
     for feature in features:
-        if len(feature.results['passed_scenarios']) + len(feature.results['passed_scenario_outlines']) == len(feature.scenarios) + len(
-                feature.scenario_outlines):
+        if feature.overall_result == STATUS_SKIPPED:
+            summary['skipped_features'].append(feature)
+        elif feature.overall_result == STATUS_PASSED:
             summary['passed_features'].append(feature)
         else:
             summary['failed_features'].append(feature)
@@ -233,7 +404,7 @@ def run(user_flat_tag_expr="", user_feature_tag_expr="", user_scenario_tag_expr=
     l.info(f"Summary:")
     l.info(f"  Features: {len(summary['passed_features'])} passed, "
            f"{len(summary['failed_features'])} failed, "
-           f"{len(summary['skipped_features'])} skipped")
+           f"{len(summary['skipped_features']) + summary['filtered_features']} skipped")
     l.info(f"  Scenario outlines: {len(summary['passed_scenario_outlines'])} passed, "
            f"{len(summary['failed_scenario_outlines'])} failed, "
            f"{len(summary['skipped_scenario_outlines'])} skipped")
@@ -246,5 +417,6 @@ def run(user_flat_tag_expr="", user_feature_tag_expr="", user_scenario_tag_expr=
     l.info(f"  Steps: {len(summary['passed_steps'])} passed, "
            f"{len(summary['failed_steps'])} failed, "
            f"{len(summary['not_executed_steps'])} not executed")
+    l.info(f"  Step bindings: {binding_cache.hits} cache hits, {binding_cache.misses} cache misses")
 
     return summary
@@ -0,0 +1,297 @@
+import multiprocessing as mp
+import queue
+import time
+import traceback
+from collections import defaultdict, deque
+from typing import AnyStr, Deque, Dict, List, Optional
+
+from tasmanium import logger, events
+from tasmanium.boiled_pickle import Feature, Context, _register_environment
+from tasmanium.constants import STATUS_FAILED
+from tasmanium.event_log import EventLog
+from tasmanium.exceptions import WorkerError
+from tasmanium.utils import _import_submodules
+
+l = logger.getLogger(__name__)
+
+UNIT_FEATURE = 'feature'
+UNIT_OUTLINE = 'outline'
+UNIT_SCENARIO = 'scenario'
+PARALLEL_UNITS = [UNIT_FEATURE, UNIT_OUTLINE, UNIT_SCENARIO]
+
+# how many units a worker may have queued at once, so that it does not wait for the parent between units
+UNITS_IN_FLIGHT_PER_WORKER = 2
+
+
+class WorkUnit:
+    """A group of scenarios of one feature executed by a single worker."""
+
+    def __init__(self, identifier: int, feature_index: int, file_path: AnyStr, scenario_indices: List[int]):
+        self.identifier: int = identifier
+        self.feature_index: int = feature_index
+        self.file_path: AnyStr = file_path
+        self.scenario_indices: List[int] = scenario_indices
+
+
+def build_work_units(features: List[Feature], parallel_unit: AnyStr) -> List[WorkUnit]:
+    """
+    Split features into work units:
+    - `feature` - one unit per feature
+    - `outline` - one unit per pure scenario and one per scenario outline with all its example rows
+    - `scenario` - one unit per pure scenario and one per example row of a scenario outline
+    """
+    if parallel_unit not in PARALLEL_UNITS:
+        raise ValueError(f"Unknown parallel unit '{parallel_unit}'.")
+
+    units: List[WorkUnit] = []
+    for feature_index, feature in enumerate(features):
+        positions = feature.positions()
+        if parallel_unit == UNIT_FEATURE:
+            groups = [positions]
+        elif parallel_unit == UNIT_OUTLINE:
+            groups = [[position] for position in positions if position[0] is None]
+            groups.extend([position for position in positions if position[0] == outline_index]
+                          for outline_index in range(len(feature.scenario_outlines)))
+        else:
+            groups = [[position] for position in positions]
+        for group in groups:
+            if len(group) > 0:
+                units.append(WorkUnit(len(units), feature_index, feature.uri, [feature.scenario_at(position).index for position in group]))
+    return units
+
+
+def _worker(worker_id: int, context: Context, task_queue: mp.Queue, result_queue: mp.Queue, cancelled: mp.Event):
+    """
+    Execute work units until a `None` arrives.
+
+    A unit arrives as a descriptor `('unit', unit identifier, feature index, file path, scenario indices, pickles)`.
+    The feature is created from the pickles of its selected scenarios parsed by the parent, so the file is not parsed again,
+    they are sent along with the first unit of each feature this worker gets.
+    Features stay started while the worker may still get their units, since with stealing those do not arrive contiguously.
+    'before_feature' runs once before the first unit of a feature this worker gets,
+    'after_feature' once the parent sends `('finish_feature', feature index)` or at the latest when the worker stops.
+    Execution events are forwarded to the parent as they happen and also written to the event log of the worker if enabled,
+    and each scenario is sent back as a compact result record as soon as it finishes.
+    Once the run is cancelled, remaining scenarios of the units are not executed.
+    """
+    features: Dict[int, Feature] = {}
+    event_log: Optional[EventLog] = None
+    try:
+        # listeners inherited from the parent live in the parent, events are forwarded to it instead
+        events.listeners.clear()
+        events.add_listener(lambda event: result_queue.put(('event', worker_id, event)))
+        if context.get_options().event_log:
+            event_log = EventLog(f"worker-{worker_id}")
+            events.add_listener(event_log)
+        _import_submodules('steps')
+        _register_environment()
+        while True:
+            descriptor = task_queue.get()
+            if descriptor is None:
+                break
+            if descriptor[0] == 'finish_feature':
+                features.pop(descriptor[1]).finish_execution()
+                continue
+            _, unit_identifier, feature_index, file_path, scenario_indices, pickles = descriptor
+            feature = features.get(feature_index)
+            if feature is None:
+                l.ttrace("worker %s executing feature '%s'...", worker_id, file_path)
+                feature = Feature(file_path, context, pickles)
+                features[feature_index] = feature
+                feature.start_execution()
+            else:
+                context.set_feature(feature)
+
+            start = time.perf_counter_ns()
+            for index in scenario_indices:
+                if cancelled.is_set():
+                    break
+                scenario = feature.scenario_by_index(index)
+                l.ttrace("executing scenario '%s'", scenario.name)
+                scenario.execute_steps()
+                result_queue.put(('scenario_finished', worker_id, unit_identifier, scenario.result_record()))
+            end = time.perf_counter_ns()
+            result_queue.put(('unit_finished', worker_id, unit_identifier, end - start))
+
+        for feature in features.values():
+            feature.finish_execution()
+    except Exception:
+        result_queue.put(('error', worker_id, traceback.format_exc()))
+        return
+    finally:
+        # scenario and event logs are complete once the worker reports back
+        logger.stop_scenario_log_sink()
+        if event_log is not None:
+            event_log.close()
+    result_queue.put(('worker_finished', worker_id))
+
+
+class Scheduler:
+    """
+    Executes work units in worker processes and collects their result records,
+    which are applied onto a feature as soon as its last unit finished, so records are not kept for the whole run.
+    Execution events of workers are published to the listeners of the parent process.
+
+    Units are split into one deque per worker. Without estimates, units of the same feature are kept together.
+    With estimated unit durations, units are ordered longest first and each is given to the least loaded worker (LPT).
+    Whenever a worker finishes a unit, it gets the next one from its own deque,
+    or steals the last unit from the worker which has the most units left.
+    A worker is told to finish a feature it started once no unit of the feature is left in any deque
+    and none is in flight at the worker, so feature hooks run once per worker and feature.
+    With `max_failures` set, the run is cancelled once that many scenarios failed:
+    no more units are dispatched, idle workers are stopped and scenarios which did not run end up skipped.
+    """
+
+    def __init__(self, features: List[Feature], context: Context, units: List[WorkUnit], parallel: int,
+                 estimates: Optional[Dict[int, int]] = None, max_failures: Optional[int] = None):
+        self.features: List[Feature] = features
+        self.context: Context = context
+        self.units: List[WorkUnit] = units
+        self.worker_count: int = max(1, min(parallel, len(units)))
+        self.max_failures: Optional[int] = max_failures
+        self.failures: int = 0
+        self.__cancelled = mp.Event()
+        self.__deques: List[Deque[WorkUnit]] = [deque() for _ in range(self.worker_count)]
+        self.__in_flight: List[int] = [0] * self.worker_count
+        # units of each feature left in the deques
+        self.__queued: Dict[int, int] = defaultdict(int)
+        # units in flight by feature index, for each feature a worker started and did not finish yet
+        self.__started_features: List[Dict[int, int]] = [{} for _ in range(self.worker_count)]
+        self.__durations: Dict[int, int] = {}
+        # result records by feature index, they are applied onto a feature once its last unit finished
+        self.__records: Dict[int, List[Dict]] = defaultdict(list)
+        # unfinished units and execution time of finished ones by feature index, for features whose records were not applied yet
+        self.__unfinished: Dict[int, int] = {feature_index: 0 for feature_index in range(len(features))}
+        self.__feature_durations: Dict[int, int] = defaultdict(int)
+
+        for unit in units:
+            self.__queued[unit.feature_index] += 1
+            self.__unfinished[unit.feature_index] += 1
+        if estimates is None:
+            chunk_size = -(-len(units) // self.worker_count)
+            for i, unit in enumerate(units):
+                self.__deques[i // chunk_size].append(unit)
+        else:
+            loads = [0] * self.worker_count
+            for unit in sorted(units, key=lambda u: estimates[u.identifier], reverse=True):
+                worker_id = loads.index(min(loads))
+                self.__deques[worker_id].append(unit)
+                loads[worker_id] += estimates[unit.identifier]
+            l.ttrace("estimated worker loads: %s", loads)
+
+    def __next_unit(self, worker_id: int) -> Optional[WorkUnit]:
+        own = self.__deques[worker_id]
+        if len(own) > 0:
+            unit = own.popleft()
+        else:
+            victim = max(self.__deques, key=len)
+            if len(victim) == 0:
+                return None
+            l.ttrace("worker %s steals a unit", worker_id)
+            unit = victim.pop()
+        self.__queued[unit.feature_index] -= 1
+        return unit
+
+    def __cancel(self):
+        l.warning(f"{self.failures} scenarios failed, cancelling the remaining work...")
+        self.__cancelled.set()
+        for own in self.__deques:
+            own.clear()
+        self.__queued.clear()
+
+    def __finish_features(self, worker_id: int, task_queues: List[mp.Queue]):
+        started = self.__started_features[worker_id]
+        for feature_index in [index for index, in_flight in started.items() if in_flight == 0 and self.__queued[index] == 0]:
+            task_queues[worker_id].put(('finish_feature', feature_index))
+            del started[feature_index]
+
+    def __apply_records(self, feature_index: int):
+        feature = self.features[feature_index]
+        for record in self.__records.pop(feature_index, []):
+            feature.scenario_by_index(record['index']).apply_result_record(record)
+        feature.gather_results(self.__feature_durations.pop(feature_index, 0))
+        del self.__unfinished[feature_index]
+
+    def __dispatch(self, worker_id: int, task_queues: List[mp.Queue]):
+        started = self.__started_features[worker_id]
+        while self.__in_flight[worker_id] < UNITS_IN_FLIGHT_PER_WORKER:
+            unit = self.__next_unit(worker_id)
+            if unit is None:
+                if self.__in_flight[worker_id] == 0:
+                    self.__finish_features(worker_id, task_queues)
+                    task_queues[worker_id].put(None)
+                    self.__in_flight[worker_id] = -1
+                return
+            pickles = None
+            if unit.feature_index not in started:
+                feature = self.features[unit.feature_index]
+                pickles = [feature.scenario_at(position).raw_pickle for position in feature.positions()]
+                started[unit.feature_index] = 0
+            task_queues[worker_id].put(('unit', unit.identifier, unit.feature_index, unit.file_path, unit.scenario_indices, pickles))
+            started[unit.feature_index] += 1
+            self.__in_flight[worker_id] += 1
+
+    def run(self) -> Dict[int, int]:
+        """Execute all units, returns execution time of each unit"""
+        if len(self.units) == 0:
+            return self.__durations
+
+        result_queue = mp.Queue()
+        task_queues = [mp.Queue() for _ in range(self.worker_count)]
+        workers = [mp.Process(target=_worker, args=(i, self.context, task_queues[i], result_queue, self.__cancelled), daemon=True)
+                   for i in range(self.worker_count)]
+        for worker in workers:
+            worker.start()
+        for worker_id in range(self.worker_count):
+            self.__dispatch(worker_id, task_queues)
+
+        running = self.worker_count
+        try:
+            while running > 0:
+                try:
+                    message = result_queue.get(timeout=1)
+                except queue.Empty:
+                    for worker_id, worker in enumerate(workers):
+                        if worker.exitcode not in [None, 0]:
+                            raise WorkerError(f"Worker {worker_id} died unexpectedly with exit code {worker.exitcode}.")
+                    continue
+
+                if message[0] == 'event':
+                    events.publish(message[2])
+                elif message[0] == 'scenario_finished':
+                    _, worker_id, unit_identifier, record = message
+                    self.__records[self.units[unit_identifier].feature_index].append(record)
+                    if record['overall_result'] == STATUS_FAILED:
+                        self.failures += 1
+                        if self.max_failures is not None and self.failures >= self.max_failures and not self.__cancelled.is_set():
+                            self.__cancel()
+                elif message[0] == 'unit_finished':
+                    _, worker_id, unit_identifier, duration_ns = message
+                    feature_index = self.units[unit_identifier].feature_index
+                    self.__durations[unit_identifier] = duration_ns
+                    self.__feature_durations[feature_index] += duration_ns
+                    self.__unfinished[feature_index] -= 1
+                    if self.__unfinished[feature_index] == 0:
+                        self.__apply_records(feature_index)
+                    self.__in_flight[worker_id] -= 1
+                    self.__started_features[worker_id][feature_index] -= 1
+                    self.__dispatch(worker_id, task_queues)
+                    # the unit may have been the last one of features other workers started
+                    for other_id in range(self.worker_count):
+                        if self.__in_flight[other_id] >= 0:
+                            self.__finish_features(other_id, task_queues)
+                elif message[0] == 'worker_finished':
+                    running -= 1
+                elif message[0] == 'error':
+                    raise WorkerError(f"Worker {message[1]} failed:\n{message[2]}")
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.join(timeout=1)
+                if worker.is_alive():
+                    worker.terminate()
+
+        # features without units, or with units which were cancelled
+        for feature_index in list(self.__unfinished):
+            self.__apply_records(feature_index)
+        return self.__durations
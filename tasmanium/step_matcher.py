@@ -0,0 +1,113 @@
+import re
+import time
+from typing import AnyStr, Callable, Dict, List, Optional, Tuple
+
+from parse import compile as compile_pattern
+
+from tasmanium import logger
+
+l = logger.getLogger(__name__)
+
+# literal part of a step pattern before its first field, '{{' being an escaped brace
+LITERAL_PREFIX_RE = re.compile(r"(?:[^{]|\{\{)*")
+
+binding_stats: Dict[AnyStr, int] = {
+    'bindings': 0,
+    'exact_matches': 0,
+    'pattern_attempts': 0,
+    'binding_time_ns': 0,
+}
+
+
+def reset_binding_stats():
+    for key in binding_stats:
+        binding_stats[key] = 0
+
+
+def _bucket_key(pattern: AnyStr) -> Optional[AnyStr]:
+    """
+    Returns the (lowercase) first word every step text matching the pattern must start with,
+    or `None` if the pattern does not start with a complete literal word.
+    """
+    prefix = LITERAL_PREFIX_RE.match(pattern).group(0).replace('{{', '{').replace('}}', '}')
+    if len(prefix) == 0 or prefix[0].isspace():
+        return None
+    words = prefix.split(None, 1)
+    if len(words) == 1 and prefix != pattern and not prefix[-1].isspace():
+        # the field is glued to the first word, e.g. 'user{id} exists'
+        return None
+    if not words[0].isascii():
+        return None
+    return words[0].lower()
+
+
+class StepMatcher:
+    """
+    Matches step texts against the patterns of one step registry.
+
+    Every pattern is compiled only once and bucketed by the first word of its literal prefix,
+    so only the patterns sharing the first word with a step text (plus the patterns without a literal prefix) are tried.
+    Buckets already contain the patterns without a literal prefix, ordered by registration.
+    The index is rebuilt lazily after a new step is registered.
+    """
+
+    def __init__(self, registry: Dict[AnyStr, Callable]):
+        self.registry: Dict[AnyStr, Callable] = registry
+        self.version: int = 0
+        self.__indexed_version: int = -1
+        self.__all: List[Tuple[int, AnyStr, Callable, object]] = []
+        self.__buckets: Dict[AnyStr, List[Tuple[int, AnyStr, Callable, object]]] = {}
+        self.__wildcards: List[Tuple[int, AnyStr, Callable, object]] = []
+
+    def invalidate(self):
+        self.version += 1
+
+    def __build_index(self):
+        l.ttrace(f"compiling {len(self.registry)} step patterns...")
+        self.__all = []
+        self.__buckets = {}
+        self.__wildcards = []
+        for i, (pattern, function) in enumerate(self.registry.items()):
+            entry = (i, pattern, function, compile_pattern(pattern))
+            self.__all.append(entry)
+            key = _bucket_key(pattern)
+            if key is None:
+                self.__wildcards.append(entry)
+            else:
+                self.__buckets.setdefault(key, []).append(entry)
+        # wildcards are merged into every bucket in the registration order, so that the first registered matching pattern wins
+        for key, bucket in self.__buckets.items():
+            self.__buckets[key] = sorted(bucket + self.__wildcards, key=lambda entry: entry[0])
+        self.__indexed_version = self.version
+
+    def __candidates(self, text: AnyStr) -> List[Tuple[int, AnyStr, Callable, object]]:
+        words = text.split(None, 1)
+        if len(words) == 0:
+            return self.__wildcards
+        if not words[0].isascii():
+            return self.__all
+        return self.__buckets.get(words[0].lower(), self.__wildcards)
+
+    def match(self, text: AnyStr) -> Optional[Tuple[Callable, Dict]]:
+        """Returns the function bound to the step text together with parsed arguments, or `None` if there is no match."""
+        start = time.perf_counter_ns()
+        binding_stats['bindings'] += 1
+        try:
+            function = self.registry.get(text)
+            if function is not None:
+                binding_stats['exact_matches'] += 1
+                l.ttrace("binding '%s' to function '%s'", text, function.__name__)
+                return function, {}
+
+            if self.__indexed_version != self.version:
+                self.__build_index()
+
+            for _, pattern, function, compiled in self.__candidates(text):
+                binding_stats['pattern_attempts'] += 1
+                r = compiled.parse(text)
+                if r is not None:
+                    l.ttrace("args parsed from '%s' by '%s': %s", text, pattern, r.named)
+                    return function, r.named
+            return None
+        finally:
+            binding_stats['binding_time_ns'] += time.perf_counter_ns() - start
@@ -0,0 +1,95 @@
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import AnyStr, Dict
+
+from tasmanium import logger
+from tasmanium.gherkin.gherkin_line import GherkinLine
+from tasmanium.gherkin.parser import Parser
+
+LARGE_FEATURE_PATH = f"{Path(__file__).resolve().parents[2]}/features/tests/large_feature_with_everything.feature"
+
+
+def scaled_feature(scale: int) -> AnyStr:
+    """Large feature with its scenarios and scenario outlines repeated `scale` times"""
+    with open(LARGE_FEATURE_PATH, "r") as f:
+        header, _, body = f.read().partition("\n")
+    return f"{header}\n" + body * scale
+
+
+def benchmark_parse(scale: int = 200, repeat: int = 3) -> Dict[AnyStr, float]:
+    """Parse the scaled large feature, report peak memory per line and throughput of the gherkin parser"""
+    data = scaled_feature(scale)
+    line_count = data.count("\n") + 1
+
+    tracemalloc.start()
+    Parser().parse(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        Parser().parse(data)
+        duration = time.perf_counter_ns() - start
+        best = duration if best is None else min(best, duration)
+
+    return {
+        'lines': line_count,
+        'bytes_per_line': peak / line_count,
+        'lines_per_second': line_count / (best / 1000000000),
+        'megabytes_per_second': len(data.encode('utf-8')) / (best / 1000000000) / 1000000,
+    }
+
+
+def benchmark_split_table_cells(columns: int = 25, rows: int = 2000, repeat: int = 3) -> Dict[AnyStr, float]:
+    """Split wide table rows with the plain splitter and with the char by char splitter used for escaped rows"""
+    row = "| " + " | ".join(f"value {column}" for column in range(columns)) + " |"
+    result = {}
+    for name, split in [('plain', GherkinLine.split_plain_table_cells), ('escaped', GherkinLine.split_escaped_table_cells)]:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter_ns()
+            for _ in range(rows):
+                list(split(row))
+            duration = time.perf_counter_ns() - start
+            best = duration if best is None else min(best, duration)
+        result[f'{name}_rows_per_second'] = rows / (best / 1000000000)
+    result['speedup'] = result['plain_rows_per_second'] / result['escaped_rows_per_second']
+    return result
+
+
+def benchmark_disabled_logging(calls: int = 200000, repeat: int = 3) -> Dict[AnyStr, float]:
+    """Per call overhead of TTRACE messages while the log level is INFO, with an f-string message and with lazy %-args"""
+    log = logger.getLogger('tasmanium.benchmark')
+    log.setLevel('INFO')
+    name, tags = "scenario name", {'feature_level': ['@tag'], 'scenario_level': [], 'example_level': []}
+    cases = {
+        'f_string': lambda: log.ttrace(f"executing scenario '{name}' with tags {tags}"),
+        'lazy_args': lambda: log.ttrace("executing scenario '%s' with tags %s", name, tags),
+    }
+    result = {}
+    for case, call in cases.items():
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter_ns()
+            for _ in range(calls):
+                call()
+            duration = time.perf_counter_ns() - start
+            best = duration if best is None else min(best, duration)
+        result[f'{case}_ns_per_call'] = best / calls
+    return result
+
+
+if __name__ == '__main__':
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    result = benchmark_parse(scale)
+    print(f"parse: {result['lines']} lines, {result['bytes_per_line']:.0f} peak bytes per line, "
+          f"{result['lines_per_second']:.0f} lines/s, {result['megabytes_per_second']:.2f} MB/s")
+    result = benchmark_split_table_cells()
+    print(f"split table cells: {result['plain_rows_per_second']:.0f} rows/s, "
+          f"{result['escaped_rows_per_second']:.0f} rows/s char by char, {result['speedup']:.1f}x speedup")
+    result = benchmark_disabled_logging()
+    print(f"disabled logging: {result['f_string_ns_per_call']:.0f} ns per call with an f-string, "
+          f"{result['lazy_args_ns_per_call']:.0f} ns per call with lazy args")
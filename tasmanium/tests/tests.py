@@ -1,7 +1,14 @@
+import io
+import json
+import multiprocessing
 import os
+import pickle
+import re
+import tempfile
 import threading
 import unittest
 import warnings
+from unittest import mock
 from pathlib import Path
 
 from selenium import webdriver
@@ -11,9 +18,22 @@ from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
 from selenium.webdriver.support import expected_conditions as ec
 from selenium.webdriver.support.ui import WebDriverWait
 
-from tasmanium import logger
-from tasmanium.boiled_pickle import Scenario, Step
-from tasmanium.runner import run, show_html
+from tasmanium import logger, events, event_log
+from tasmanium import parse_cache, attachment_store, feature_index, timings
+from tasmanium.boiled_pickle import Scenario, Step, BindingCache, Context, Feature, _tag_filter, _select_lines
+from tasmanium.constants import FEATURES_PATH
+from tasmanium.exceptions import LineNotFoundError, FeatureParseError
+from tasmanium.gherkin.gherkin_line import GherkinLine
+from tasmanium.gherkin.pickles.compiler import pickle_steps, _placeholders, _tokenize, _render
+from tasmanium.gherkin.stream.pipeline import StreamOptions, stream_events
+from tasmanium.gherkin.parser import Parser
+from tasmanium.gherkin.token import Token
+from tasmanium.gherkin.token_matcher import TokenMatcher
+from tasmanium.gherkin.token_scanner import TokenScanner
+from tasmanium.runner import run, show_html, register_steps, filter_by_tags, parse_features
+from tasmanium.scheduler import Scheduler, build_work_units, PARALLEL_UNITS
+from tasmanium.step_matcher import StepMatcher, _bucket_key, binding_stats, reset_binding_stats
+from tasmanium.utils import _glob_feature_files_and_lines
 
 # test list
 flat_view_button_id = (By.ID, 'show-flat')
@@ -343,6 +363,40 @@ class HTMLReporter(unittest.TestCase):
         self.verify_html_reporter(summary)
 
 
+class ReferenceTokenScanner(TokenScanner):
+    """Reads text line by line like the scanner did before the document was split at once."""
+
+    def __init__(self, text):
+        self.io = io.StringIO(text)
+        self.line_number = 0
+
+    def read(self):
+        self.line_number += 1
+        line = self.io.readline()
+        return Token((GherkinLine(line, self.line_number) if line else line), {'line': self.line_number, 'column': 0})
+
+
+class ReferenceTokenMatcher(TokenMatcher):
+    """Tries keywords one by one like the matcher did before lines were classified once."""
+
+    def match_StepLine(self, token):
+        keywords = (self.dialect.given_keywords + self.dialect.when_keywords + self.dialect.then_keywords +
+                    self.dialect.and_keywords + self.dialect.but_keywords)
+        for keyword in (k for k in keywords if token.line.startswith(k)):
+            self._set_token_matched(token, 'StepLine', token.line.get_rest_trimmed(len(keyword)), keyword)
+            return True
+        return False
+
+    def _match_title_line(self, token, token_type):
+        keywords = {'FeatureLine': self.dialect.feature_keywords, 'ScenarioLine': self.dialect.scenario_keywords,
+                    'ScenarioOutlineLine': self.dialect.scenario_outline_keywords, 'BackgroundLine': self.dialect.background_keywords,
+                    'ExamplesLine': self.dialect.examples_keywords}[token_type]
+        for keyword in (k for k in keywords if token.line.startswith_title_keyword(k)):
+            self._set_token_matched(token, token_type, token.line.get_rest_trimmed(len(keyword) + len(':')), keyword)
+            return True
+        return False
+
+
 class Unit(unittest.TestCase):
     """Execute some tests and verify some tidbits."""
 
@@ -367,6 +421,599 @@ class Unit(unittest.TestCase):
             for r in range(scenario.repeat_count):
                 self.assertEqual(len(scenario.results[r]['failed_steps']), 1)
 
+    def test_tag_filtered_scenarios_are_skipped_alike_with_and_without_parse_cache(self):
+        def skipped_counts(paths, tag_expression, parse_cache):
+            summary = run(user_flat_tag_expr=tag_expression, feature_paths=paths, log_level='INFO', parse_cache=parse_cache, timing_history=False)
+            return (len(summary['skipped_features']) + summary['filtered_features'], len(summary['skipped_scenario_outlines']),
+                    len(summary['skipped_pure_scenarios']), len(summary['skipped_scenarios']))
+
+        for parse_cache in [True, False]:
+            with self.subTest(parse_cache=parse_cache):
+                self.assertEqual(skipped_counts(['/tests/large_feature_with_everything.feature'], "not @skipme", parse_cache), (0, 1, 1, 6))
+                # files without any matching scenario are dropped by the feature index or left empty after parsing
+                self.assertEqual(skipped_counts(['/tests'], "@skipme", parse_cache), (10, 2, 2, 16))
+
+    def test_tag_filtered_scenarios_need_no_step_definitions(self):
+        with tempfile.TemporaryDirectory(dir=FEATURES_PATH) as directory:
+            with open(f"{directory}/undefined.feature", "w") as f:
+                f.write("Feature: undefined\n  Scenario: defined\n    Given empty given\n"
+                        "  @skipme\n  Scenario: undefined\n    Given no step definition matches this\n"
+                        "  Scenario Outline: undefined <n>\n    Given no step definition matches <n>\n"
+                        "    @skipme\n    Examples:\n      | n |\n      | 1 |\n      | 2 |\n")
+            for parse_cache in [True, False]:
+                with self.subTest(parse_cache=parse_cache):
+                    summary = run(user_flat_tag_expr="not @skipme", feature_paths=[f"{os.path.basename(directory)}/undefined.feature"], log_level='INFO',
+                                  parse_cache=parse_cache,
+                                  timing_history=False, html_report=True)
+                    self.assertEqual(len(summary['passed_scenarios']), 1)
+                    self.assertEqual(len(summary['skipped_scenarios']), 3)
+                    self.assertTrue(all(scenario.steps == [] for scenario in summary['skipped_scenarios']))
+
+    def test_messages_report_references_resolve(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/messages.ndjson"
+            run(user_flat_tag_expr="not @skipme", feature_paths=['/tests/large_feature_with_everything.feature', '/tests/two_scenarios.feature'],
+                parallel=2, log_level='INFO', failed_repeat_count=1, timing_history=False, messages_report=path)
+            with open(path, "r") as f:
+                envelopes = [json.loads(line) for line in f]
+
+        types = [next(iter(envelope)) for envelope in envelopes]
+        messages = {message_type: [envelope[message_type] for envelope in envelopes if message_type in envelope] for message_type in set(types)}
+        self.assertEqual(types[0], 'meta')
+        self.assertLess(max(i for i, t in enumerate(types) if t in ('source', 'pickle')), types.index('testRunStarted'))
+        self.assertLess(types.index('testRunStarted'), types.index('testCase'))
+        self.assertNotIn('gherkinDocument', types)
+
+        sources = {source['uri'] for source in messages['source']}
+        self.assertTrue(all(pickle['uri'] in sources for pickle in messages['pickle']))
+        pickle_ids = {pickle['id'] for pickle in messages['pickle']}
+        pickle_step_ids = {step['id'] for pickle in messages['pickle'] for step in pickle['steps']}
+        self.assertEqual({test_case['pickleId'] for test_case in messages['testCase']}, pickle_ids)
+        self.assertTrue(all(step['pickleStepId'] in pickle_step_ids for test_case in messages['testCase'] for step in test_case['testSteps']))
+
+        test_case_ids = {test_case['id'] for test_case in messages['testCase']}
+        test_step_ids = {step['id'] for test_case in messages['testCase'] for step in test_case['testSteps']}
+        self.assertTrue(all(started['testCaseId'] in test_case_ids for started in messages['testCaseStarted']))
+        started_ids = {started['id'] for started in messages['testCaseStarted']}
+        for message_type in ['testStepStarted', 'testStepFinished', 'attachment']:
+            self.assertTrue(all(message['testCaseStartedId'] in started_ids and message['testStepId'] in test_step_ids
+                                for message in messages.get(message_type, [])), message_type)
+        self.assertEqual({finished['testCaseStartedId'] for finished in messages['testCaseFinished']}, started_ids)
+
+    def test_outline_with_as_many_filtered_as_matching_rows_is_kept(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/outline.feature"
+            with open(path, "w") as f:
+                f.write("Feature: outline rows\n"
+                        "  Scenario Outline: outline <v>\n"
+                        "    Given empty given\n"
+                        "    @wip\n"
+                        "    Examples:\n"
+                        "      | v |\n"
+                        "      | 1 |\n"
+                        "    Examples:\n"
+                        "      | v |\n"
+                        "      | 2 |\n")
+            for parse_cache in [True, False]:
+                with self.subTest(parse_cache=parse_cache):
+                    context = Context()
+                    context.get_options().parse_cache = parse_cache
+                    context.get_options().tag_expressions = {'flat': 'not @wip'}
+                    summary = {'skipped_features': []}
+                    feature, = filter_by_tags([Feature(path, context)], summary, "not @wip", "", "", "")
+                    self.assertEqual([scenario.name for scenario in feature.scenario_outlines[0].scenarios], ['outline 2'])
+                    self.assertEqual([scenario.name for scenario in feature.scenario_outlines[0].results['skipped_scenarios']], ['outline 1'])
+                    self.assertEqual(feature.results['skipped_scenario_outlines'], [])
+
+    def test_scenario_result_record_round_trip(self):
+        register_steps()
+        os.makedirs(f"{logger.LOGFILE_PATH}/scenarios", exist_ok=True)
+        path = f"{os.getcwd()}/features/tests/large_feature_with_everything.feature"
+        context = Context()
+        context.get_options().failed_repeat_count = 1
+        context.get_options().tag_expressions = {'flat': 'not @skipme'}
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.object(attachment_store, 'ATTACHMENTS_PATH', f"{directory}/attachments"):
+            executed = Feature(path, context)
+            executed.start_execution()
+            for position in executed.positions():
+                executed.scenario_at(position).execute_steps()
+            executed.finish_execution()
+            logger.stop_scenario_log_sink()
+
+        # the mirrored feature is created from the pickles like in a worker, records travel pickled like between processes
+        positions = executed.positions()
+        mirrored = Feature(path, Context(), [executed.scenario_at(position).raw_pickle for position in positions])
+        for position in positions:
+            record = pickle.loads(pickle.dumps(executed.scenario_at(position).result_record()))
+            mirrored.scenario_by_index(record['index']).apply_result_record(record)
+
+        statuses = set()
+        for position in positions:
+            original, copy = executed.scenario_at(position), mirrored.scenario_at(position)
+            statuses.add(original.overall_result)
+            self.assertEqual((copy.index, copy.name), (original.index, original.name))
+            self.assertEqual(copy.overall_result, original.overall_result)
+            self.assertEqual(copy.identifiers, original.identifiers)
+            self.assertEqual([r['execution_time_ns'] for r in copy.results], [r['execution_time_ns'] for r in original.results])
+            for key in ['passed_steps', 'failed_steps', 'not_executed_steps']:
+                self.assertEqual([len(r[key]) for r in copy.results], [len(r[key]) for r in original.results])
+            for original_step, copy_step in zip(original.steps, copy.steps):
+                self.assertEqual(copy_step.identifiers, original_step.identifiers)
+                self.assertEqual([r['status'] for r in copy_step.results], [r['status'] for r in original_step.results])
+                self.assertEqual([r['exception']['name'] if r['exception'] else None for r in copy_step.results],
+                                 [r['exception']['name'] if r['exception'] else None for r in original_step.results])
+                self.assertEqual([[vars(a) for a in attachments] for attachments in copy_step.attachments],
+                                 [[vars(a) for a in attachments] for attachments in original_step.attachments])
+        self.assertEqual(statuses, {'passed', 'failed'})
+
+    def test_step_matcher_keeps_registration_order(self):
+        registry = {}
+        matcher = StepMatcher(registry)
+        registry["a user named {name} exists"] = "named"
+        registry["{anything} exists"] = "anything"
+        registry["a user which {status}"] = "status"
+        registry["user{id} exists"] = "glued"
+        matcher.invalidate()
+
+        self.assertEqual(matcher.match("a user named Bob exists"), ("named", {'name': 'Bob'}))
+        self.assertEqual(matcher.match("A USER which exists"), ("anything", {'anything': 'A USER which'}))
+        self.assertEqual(matcher.match("a user which sleeps"), ("status", {'status': 'sleeps'}))
+        self.assertEqual(matcher.match("user42 sleeps"), None)
+        self.assertEqual(matcher.match("a user which exists")[0], "anything")
+
+    def test_step_pattern_bucket_keys(self):
+        self.assertEqual(_bucket_key("exemplar {value} given"), "exemplar")
+        self.assertEqual(_bucket_key("Empty given"), "empty")
+        self.assertEqual(_bucket_key("a user named {name}"), "a")
+        self.assertIsNone(_bucket_key("user{id} exists"))
+        self.assertIsNone(_bucket_key("{anything} exists"))
+        self.assertIsNone(_bucket_key(" leading space {x}"))
+
+    def test_step_matcher_tries_only_bucket_and_wildcards(self):
+        registry = {f"word{i} {{value}} given": f"word{i}" for i in range(50)}
+        registry["{anything} happens"] = "wildcard"
+        matcher = StepMatcher(registry)
+        matcher.invalidate()
+
+        reset_binding_stats()
+        self.assertEqual(matcher.match("word7 five given"), ("word7", {'value': 'five'}))
+        self.assertEqual(binding_stats['pattern_attempts'], 1)
+
+        reset_binding_stats()
+        self.assertEqual(matcher.match("nothing happens"), ("wildcard", {'anything': 'nothing'}))
+        self.assertEqual(binding_stats['pattern_attempts'], 1)
+
+        reset_binding_stats()
+        self.assertEqual(matcher.match("word7 happens"), ("wildcard", {'anything': 'word7'}))
+        self.assertEqual(binding_stats['pattern_attempts'], 2)
+        self.assertIsNone(matcher.match("unknown step"))
+
+    def test_step_matcher_ambiguous_steps_bind_to_first_registered(self):
+        registry = {"{anything} given": "wildcard", "exemplar {value} given": "exemplar", "exemplar {a} {b}": "two fields"}
+        matcher = StepMatcher(registry)
+        matcher.invalidate()
+        self.assertEqual(matcher.match("exemplar one given")[0], "wildcard")
+
+        registry = {"exemplar {a} {b}": "two fields", "exemplar {value} given": "exemplar", "{anything} given": "wildcard"}
+        matcher = StepMatcher(registry)
+        matcher.invalidate()
+        self.assertEqual(matcher.match("exemplar one given")[0], "two fields")
+
+    def test_binding_cache_is_bounded(self):
+        register_steps()
+        cache = BindingCache(2)
+        function, kwargs = cache.bind('Given', 'exemplar one given')
+        kwargs['value'] = 'mutated'
+        self.assertEqual(cache.bind('Given', 'exemplar one given'), (function, {'value': 'one'}))
+        cache.bind('Given', 'exemplar two given')
+        cache.bind('Given', 'exemplar three given')
+        cache.bind('Given', 'exemplar one given')
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+
+    def test_line_selectors_select_scenarios_outlines_examples_and_rows(self):
+        with tempfile.TemporaryDirectory(dir=FEATURES_PATH) as directory:
+            path = f"{os.path.basename(directory)}/selected.feature"
+            with open(f"{directory}/selected.feature", "w") as f:
+                f.write("Feature: selected\n  Scenario: plain\n    Given empty given\n"
+                        "  Scenario Outline: outline <n>\n    Given exemplar <n> given\n"
+                        "    Examples: first\n      | n |\n      | 1 |\n      | 2 |\n"
+                        "    Examples: second\n      | n |\n      | 3 |\n")
+            file_path = str(Path(f"{directory}/selected.feature").resolve())
+            self.assertEqual(_glob_feature_files_and_lines([f"{path}:2:12"]), ([file_path], {file_path: {2, 12}}))
+            self.assertEqual(_glob_feature_files_and_lines([path]), ([file_path], {}))
+            # a whole file overrides line selections of the same file, in any order
+            self.assertEqual(_glob_feature_files_and_lines([f"{path}:2", path]), ([file_path], {}))
+            self.assertEqual(_glob_feature_files_and_lines([path, f"{path}:2"]), ([file_path], {}))
+            with self.assertRaises(ValueError):
+                _glob_feature_files_and_lines([f"{os.path.basename(directory)}:2"])
+
+            with open(file_path, "rb") as f:
+                pickles = parse_cache.parse_pickles(f.read())
+        selected_names = lambda lines: [pickle['name'] for pickle in _select_lines(pickles, lines)]
+        self.assertEqual(selected_names({2}), ['plain'])
+        self.assertEqual(selected_names({4}), ['outline 1', 'outline 2', 'outline 3'])
+        self.assertEqual(selected_names({6}), ['outline 1', 'outline 2'])
+        self.assertEqual(selected_names({9}), ['outline 2'])
+        self.assertEqual(selected_names({2, 12}), ['plain', 'outline 3'])
+        for lines in [{3}, {7}, {2, 13}]:
+            with self.subTest(lines=lines), self.assertRaises(LineNotFoundError):
+                _select_lines(pickles, lines)
+
+    def test_parse_cache_is_invalidated_on_change(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/cached.feature"
+            with open(path, "w") as f:
+                f.write("Feature: cached\n  Scenario: first\n    Given empty given\n")
+            self.assertEqual(parse_cache.load_pickles(path)[0]['name'], 'first')
+            self.assertEqual(parse_cache.load_pickles(path)[0]['name'], 'first')
+
+            with open(path, "w") as f:
+                f.write("Feature: cached\n  Scenario: second one\n    Given empty given\n")
+            self.assertEqual(parse_cache.load_pickles(path)[0]['name'], 'second one')
+
+    def test_feature_index_selects_files_by_tags(self):
+        with tempfile.TemporaryDirectory() as directory:
+            tagged_path, other_path = f"{directory}/tagged.feature", f"{directory}/other.feature"
+            with open(tagged_path, "w") as f:
+                f.write("Feature: tagged\n  @wip\n  Scenario: first\n    Given empty given\n")
+            with open(other_path, "w") as f:
+                f.write("Feature: other\n  Scenario: second\n    Given empty given\n")
+            index = {}
+            self.assertEqual(feature_index.update_index(index, [tagged_path, other_path]), 2)
+            self.assertEqual(feature_index.update_index(index, [tagged_path, other_path]), 0)
+            # a touched file is not re-parsed but its entry changes, so the index gets saved
+            stat = os.stat(tagged_path)
+            os.utime(tagged_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+            self.assertEqual(feature_index.update_index(index, [tagged_path, other_path]), 1)
+            self.assertEqual(index[tagged_path]['mtime_ns'], stat.st_mtime_ns + 1000000000)
+            self.assertEqual(feature_index.update_index(index, [tagged_path, other_path]), 0)
+            self.assertEqual(index[tagged_path]['scenarios'][0]['line'], 3)
+            self.assertEqual(index[tagged_path]['scenarios'][0]['steps'], ['empty given'])
+
+            tag_filter = _tag_filter({'flat': '@wip'})
+            self.assertEqual(feature_index.select_files(index, [tagged_path, other_path], tag_filter), [tagged_path])
+
+    def test_scenario_logs_are_routed_by_thread(self):
+        os.makedirs(f"{logger.LOGFILE_PATH}/scenarios", exist_ok=True)
+        log = logger.getLogger('tasmanium.tests.routing')
+        log.setLevel('INFO')
+
+        def scenario(identifier):
+            logger.set_scenario_handler(identifier)
+            for i in range(100):
+                log.info("%s message %s", identifier, i)
+            logger.remove_scenario_handler()
+
+        threads = [threading.Thread(target=scenario, args=(f"routing-test-{i}",)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.stop_scenario_log_sink()
+
+        for i in range(2):
+            with open(f"{logger.LOGFILE_PATH}/scenarios/routing-test-{i}.log", "r") as f:
+                lines = f.read().splitlines()
+            os.remove(f"{logger.LOGFILE_PATH}/scenarios/routing-test-{i}.log")
+            self.assertEqual(len(lines), 100)
+            self.assertTrue(all(f"routing-test-{i} message" in line for line in lines))
+
+    @staticmethod
+    def scheduled_features(context):
+        register_steps()
+        os.makedirs(f"{logger.LOGFILE_PATH}/scenarios", exist_ok=True)
+        context.get_options().tag_expressions = {'flat': 'not @skipme'}
+        return [Feature(f"{os.getcwd()}/features/tests/{name}.feature", context)
+                for name in ['large_feature_with_everything', 'two_scenario_outlines_more_examples']]
+
+    def test_build_work_units_modes(self):
+        features = self.scheduled_features(Context())
+        units = {mode: build_work_units(features, mode) for mode in PARALLEL_UNITS}
+        self.assertEqual([(u.feature_index, len(u.scenario_indices)) for u in units['feature']], [(0, 16), (1, 4)])
+        self.assertEqual([(u.feature_index, len(u.scenario_indices)) for u in units['outline']],
+                         [(0, 1), (0, 1), (0, 2), (0, 8), (0, 4), (1, 2), (1, 2)])
+        self.assertEqual(len(units['scenario']), 20)
+        for mode_units in units.values():
+            self.assertEqual([u.identifier for u in mode_units], list(range(len(mode_units))))
+            self.assertEqual([sorted(i for u in mode_units if u.feature_index == f for i in u.scenario_indices) for f in range(2)],
+                             [sorted(feature.scenario_at(p).index for p in feature.positions()) for feature in features])
+        with self.assertRaises(ValueError):
+            build_work_units(features, 'step')
+
+    def test_scheduler_starts_and_finishes_features_once_per_worker(self):
+        for mode in PARALLEL_UNITS:
+            with self.subTest(mode=mode):
+                context = Context()
+                features = self.scheduled_features(context)
+                received = []
+                events.add_listener(received.append)
+                try:
+                    durations = Scheduler(features, context, build_work_units(features, mode), 3).run()
+                finally:
+                    events.remove_listener(received.append)
+                    logger.stop_scenario_log_sink()
+
+                self.assertEqual(len(durations), len(build_work_units(features, mode)))
+                for feature in features:
+                    self.assertTrue(all(feature.scenario_at(p).overall_result in ['passed', 'failed'] for p in feature.positions()))
+                for pid in {event['pid'] for event in received}:
+                    for uri in {feature.uri for feature in features}:
+                        types = [event['type'] for event in received if event['pid'] == pid and event.get('uri') == uri]
+                        if len(types) == 0:
+                            continue
+                        self.assertEqual((types[0], types[-1]), ('feature_started', 'feature_finished'))
+                        self.assertEqual((types.count('feature_started'), types.count('feature_finished')), (1, 1))
+
+    def test_scheduler_cancels_after_max_failures(self):
+        context = Context()
+        features = self.scheduled_features(context)
+        scheduler = Scheduler(features, context, build_work_units(features, 'scenario'), 2, max_failures=1)
+        try:
+            scheduler.run()
+        finally:
+            logger.stop_scenario_log_sink()
+
+        statuses = [feature.scenario_at(p).overall_result for feature in features for p in feature.positions()]
+        self.assertGreaterEqual(scheduler.failures, 1)
+        self.assertIn('skipped', statuses)
+        # every worker was stopped once there was nothing left to dispatch
+        self.assertEqual(multiprocessing.active_children(), [])
+
+    def test_timings_round_trip_and_estimates(self):
+        context = Context()
+        features = self.scheduled_features(context)
+        units = build_work_units(features, 'scenario')
+        try:
+            Scheduler(features, context, units, 2).run()
+        finally:
+            logger.stop_scenario_log_sink()
+
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(timings, 'TIMINGS_PATH', f"{directory}/timings.json"):
+            self.assertEqual(timings.load_timings(), {})
+            timings.save_timings({}, features)
+            history = timings.load_timings()
+        for feature in features:
+            recorded = history[feature.uri]['scenarios']
+            self.assertEqual(len(recorded), len(feature.positions()))
+            self.assertEqual(history[feature.uri]['execution_time_ns'], feature.results['execution_time_ns'])
+        estimates = timings.estimate_unit_durations(units, features, history)
+        for unit in units:
+            scenario = features[unit.feature_index].scenario_by_index(unit.scenario_indices[0])
+            self.assertEqual(estimates[unit.identifier], history[scenario.uri]['scenarios'][timings.scenario_key(scenario)])
+
+        # scenarios missing from the history are estimated by the average step duration times their step count
+        known, unknown = features[0].scenario_at(features[0].positions()[0]), features[1].scenario_at(features[1].positions()[0])
+        history = {known.uri: {'execution_time_ns': None, 'scenarios': {timings.scenario_key(known): 1000 * len(known.steps)}}}
+        estimates = timings.estimate_unit_durations(units, features, history)
+        self.assertEqual(estimates[units[0].identifier], 1000 * len(known.steps))
+        self.assertEqual(estimates[[u for u in units if u.feature_index == 1][0].identifier], 1000 * len(unknown.steps))
+        self.assertEqual(timings.estimate_unit_durations(units[:1], features, {})[0], timings.DEFAULT_STEP_DURATION_NS * len(known.steps))
+
+    def test_scheduler_assigns_longest_units_to_least_loaded_workers(self):
+        context = Context()
+        features = self.scheduled_features(context)
+        units = build_work_units(features, 'outline')
+        estimates = {0: 5, 1: 1, 2: 8, 3: 3, 4: 7, 5: 2, 6: 4}
+        received = []
+        events.add_listener(received.append)
+        try:
+            durations = Scheduler(features, context, units, 2, estimates).run()
+        finally:
+            events.remove_listener(received.append)
+            logger.stop_scenario_log_sink()
+
+        self.assertEqual(sorted(durations), list(range(len(units))))
+        unit_ids = {(features[unit.feature_index].uri, index): unit.identifier for unit in units for index in unit.scenario_indices}
+        started = [(event['pid'], unit_ids[event['uri'], event['scenario_index']]) for event in received if event['type'] == 'scenario_started']
+        pids = list(dict.fromkeys(pid for pid, _ in started))
+        self.assertEqual(len(pids), 2)
+        # every unit runs on a single worker, and each worker starts with the longest unit left for it
+        self.assertTrue(all(len({pid for pid, unit_id in started if unit_id == identifier}) == 1 for identifier in range(len(units))))
+        self.assertEqual({next(unit_id for pid, unit_id in started if pid == worker_pid) for worker_pid in pids}, {2, 4})
+
+    def test_scenario_logs_include_threads_started_by_steps(self):
+        os.makedirs(f"{logger.LOGFILE_PATH}/scenarios", exist_ok=True)
+        log = logger.getLogger('tasmanium.tests.routing')
+        log.setLevel('INFO')
+        path = f"{logger.LOGFILE_PATH}/scenarios/spawning-test.log"
+
+        logger.set_scenario_handler("spawning-test")
+        log.info("from the scenario")
+        thread = threading.Thread(target=log.info, args=("from a thread started by a step",))
+        thread.start()
+        thread.join()
+        logger.remove_scenario_handler()
+        log.info("after the scenario")
+        logger.stop_scenario_log_sink()
+
+        with open(path, "r") as f:
+            lines = f.read().splitlines()
+        os.remove(path)
+        self.assertEqual(len(lines), 2)
+        self.assertIn("from the scenario", lines[0])
+        self.assertIn("from a thread started by a step", lines[1])
+
+    def test_parse_features_with_processes_keeps_file_order_and_collects_errors(self):
+        context = Context()
+        context.get_options().parse_cache = False
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [f"{directory}/{i}.feature" for i in range(8)]
+            for i, path in enumerate(paths):
+                with open(path, "w") as f:
+                    f.write(f"Feature: feature {i}\n" + "".join(f"  Scenario: scenario {n}\n    Given empty given\n" for n in range(8 - i)))
+            self.assertEqual([feature.uri for feature in parse_features(paths, context, 3)], paths)
+            self.assertEqual([feature.name for feature in parse_features(paths, context, 3)],
+                             [feature.name for feature in parse_features(paths, context, 1)])
+
+            with open(paths[2], "w") as f:
+                f.write("Feature: invalid\n  Nonsense line\n")
+            with open(paths[5], "w") as f:
+                f.write("")
+            with self.assertRaises(FeatureParseError) as raised:
+                parse_features(paths, context, 3)
+        message = str(raised.exception)
+        self.assertTrue(message.startswith("Failed to parse 2 out of 8 feature files:"))
+        self.assertLess(message.index(paths[2]), message.index(paths[5]))
+        self.assertIn(f"{paths[5]}: EmptyFeatureError", message)
+
+    def test_stream_events_with_processes_match_serial_stream(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [f"{directory}/{name}.feature" for name in ['first', 'invalid', 'second', 'third', 'fourth']]
+            for path in paths:
+                with open(path, "w") as f:
+                    if 'invalid' in path:
+                        f.write("Feature: invalid\n  Scenario: first\n    Given a step\n  Nonsense line\n")
+                    else:
+                        f.write(f"Feature: {path}\n  Scenario Outline: <n>\n    Given exemplar <n> given\n"
+                                f"    Examples:\n      | n |\n      | 1 |\n      | 2 |\n")
+            serial = list(stream_events(paths, StreamOptions(), 1))
+            pooled = list(stream_events(paths, StreamOptions(), 2))
+
+        self.assertEqual(pooled, serial)
+        self.assertEqual(list(dict.fromkeys(event.get('uri') or event['source']['uri'] for event in pooled)), paths)
+        invalid = [event for event in pooled if (event.get('uri') or event['source']['uri']) == paths[1]]
+        self.assertTrue(len(invalid) > 0 and all(event['type'] == 'attachment' for event in invalid))
+        self.assertEqual(invalid[0]['source']['start']['line'], 4)
+        self.assertEqual([event['type'] for event in pooled if event.get('uri') == paths[0]], ['source', 'gherkin-document', 'pickle', 'pickle'])
+
+    def test_event_logs_are_written_per_process_and_merged(self):
+        def worker(forwarded):
+            worker_log = event_log.EventLog("worker-0")
+            events.add_listener(worker_log)
+            events.add_listener(forwarded.put)
+            for i in range(3):
+                events.emit('scenario_finished', scenario_index=i)
+            worker_log.close()
+
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(event_log, 'EVENT_LOG_PATH', directory):
+            main_log = event_log.EventLog("main")
+            events.add_listener(main_log)
+            try:
+                events.emit('run_started')
+                forwarded = multiprocessing.Queue()
+                process = multiprocessing.Process(target=worker, args=(forwarded,))
+                process.start()
+                # events forwarded by the worker are left to its own log, also the log inherited by the worker ignores them
+                for _ in range(3):
+                    events.publish(forwarded.get(timeout=10))
+                process.join()
+                events.emit('run_finished')
+            finally:
+                events.remove_listener(main_log)
+                main_log.close()
+
+            self.assertEqual(sorted(os.listdir(directory)), ['main.ndjson', 'worker-0.ndjson'])
+            with open(f"{directory}/main.ndjson", "r") as f:
+                self.assertEqual([json.loads(line)['type'] for line in f], ['run_started', 'run_finished'])
+            with open(f"{directory}/worker-0.ndjson", "r") as f:
+                self.assertEqual([json.loads(line)['pid'] for line in f], [process.pid] * 3)
+            merged = list(event_log.read_events(directory))
+            self.assertEqual([(event['type'], event.get('scenario_index')) for event in merged],
+                             [('run_started', None)] + [('scenario_finished', i) for i in range(3)] + [('run_finished', None)])
+            self.assertEqual([event['timestamp_ns'] for event in merged], sorted(event['timestamp_ns'] for event in merged))
+
+    def test_outline_interpolation_matches_sequential_substitution(self):
+        def interpolate(text, headers, values):
+            # substitution of the compiler before templates were tokenized
+            for header, value in zip(headers, values):
+                text = re.sub(u'<{0}>'.format(header), value, text)
+            return text
+
+        def render(text, headers, values):
+            return _render(_tokenize(text, _placeholders([{'value': header} for header in headers])), values)
+
+        for text, headers, values in [
+            ("plain <a> and <b>, <a> again", ['a', 'b'], ['1', '2']),
+            ("no placeholders", ['a'], ['1']),
+            ("<a><b> <c>", ['a', 'b'], ['x', '']),
+            ("<a>", [], []),
+            ("unicode <ä>", ['ä'], ['ö']),
+        ]:
+            with self.subTest(text=text):
+                self.assertEqual(render(text, headers, values), interpolate(text, headers, values))
+
+        # regex metacharacters in headers and backslashes in values are taken literally
+        self.assertEqual(render("<a.b> <a+> <[x]>", ['a.b', 'a+', '[x]'], ['1', '2', '3']), "1 2 3")
+        self.assertEqual(render("<a_b>", ['a.b'], ['1']), "<a_b>")
+        self.assertEqual(render("<path>", ['path'], [r'C:\new\1']), r'C:\new\1')
+        # values are not interpolated again, and the first of duplicate headers is used
+        self.assertEqual(render("<a> <b>", ['a', 'b'], ['<b>', '2']), "<b> 2")
+        self.assertEqual(render("<a>", ['a', 'a'], ['1', '2']), "1")
+
+        pickles = parse_cache.parse_pickles(
+            b"Feature: interpolated\n  Scenario Outline: <name>\n    Given a table\n      | <name> | <other> |\n"
+            b"    Then a doc string\n      ```<type>\n      <name> is <other>\n      ```\n"
+            b"    Examples:\n      | name | other | type |\n      | x\\\\y | <name> | text |\n")
+        self.assertEqual(pickles[0]['name'], "x\\y")
+        table, doc_string = [step['arguments'][0] for step in pickle_steps(pickles[0])]
+        self.assertEqual([cell['value'] for cell in table['rows'][0]['cells']], ["x\\y", "<name>"])
+        self.assertEqual([cell['raw_value'] for cell in table['rows'][0]['cells']], ["<name>", "<other>"])
+        self.assertEqual((doc_string['content'], doc_string['contentType']), ("x\\y is <name>", "text"))
+
+    def test_plain_table_cells_match_escaped_character_loop(self):
+        rows = ["| a | b |", "|a|b|", "| a | b", "|", "||", "| | |", "no pipes", "| a |b  |   c|", "  | leading and trailing |  ",
+                "| ä | 😀 |", "before | a | after", "| a\\|b | c |", "| a\\\\ | \\n |", "| \\| |"]
+        for row in rows:
+            with self.subTest(row=row):
+                expected = list(GherkinLine.split_escaped_table_cells(row))
+                if '\\' not in row:
+                    self.assertEqual(list(GherkinLine.split_plain_table_cells(row)), expected)
+                line = GherkinLine(f"    {row}", 1)
+                self.assertEqual(list(line.split_table_cells(row)), expected)
+                self.assertEqual(line.table_cells,
+                                 [{'column': col + line.indent + len(cell) - len(cell.lstrip()), 'text': cell.strip()}
+                                  for cell, col in GherkinLine.split_escaped_table_cells(row.strip())])
+
+    def test_parser_output_matches_reference_keyword_matching(self):
+        # keywords sharing a prefix: 'Exemple'/'Exemples', 'Et '/'Et que '/'Et qu\'', 'Sachant '/'Sachant que '
+        text = ("# language: fr\n"
+                "Fonctionnalité: préfixes\n"
+                "  Contexte:\n"
+                "    Sachant qu'un contexte existe\n"
+                "  Exemple: premier\n"
+                "    Sachant que le premier existe\n"
+                "    Et que rien ne change\n"
+                "    Et qu'il ne se passe rien\n"
+                "    Mais le reste: passe\n"
+                "  Plan du scénario: plan <valeur>\n"
+                "    Soit <valeur>\n"
+                "    Exemples: valeurs\n"
+                "      | valeur |\n"
+                "      | a      |\n"
+                "  Scénario: Exemples: pas un titre d'exemples\n"
+                "    * rien\n")
+        reference = Parser().parse(ReferenceTokenScanner(text), ReferenceTokenMatcher())
+        self.assertEqual(Parser().parse(TokenScanner(text), TokenMatcher()), reference)
+        self.assertEqual(len(reference['feature']['children']), 4)
+
+        crlf_text = text.replace("\n", "\r\n")
+        self.assertEqual(Parser().parse(TokenScanner(crlf_text), TokenMatcher()),
+                         Parser().parse(ReferenceTokenScanner(crlf_text), ReferenceTokenMatcher()))
+
+        with tempfile.TemporaryDirectory() as directory:
+            for name, content in [("lf.feature", text), ("crlf.feature", crlf_text)]:
+                with open(f"{directory}/{name}", "w", encoding='utf8', newline='') as f:
+                    f.write(content)
+                # files are read with universal newlines, so both parse like the text with '\n'
+                self.assertEqual(Parser().parse(TokenScanner(f"{directory}/{name}"), TokenMatcher()), reference)
+
+    def test_attachment_store_deduplicates_data(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.object(attachment_store, 'ATTACHMENTS_PATH', f"{directory}/attachments"):
+            first_path, size = attachment_store.store(b"same data")
+            second_path, _ = attachment_store.store(b"same data")
+            other_path, _ = attachment_store.store(b"other data")
+            self.assertEqual(first_path, second_path)
+            self.assertNotEqual(first_path, other_path)
+            self.assertTrue(first_path.startswith(f"{directory}/attachments/"))
+            self.assertEqual(size, len(b"same data"))
+
+            attachment_store.link(first_path, f"{directory}/linked.txt")
+            attachment_store.link(first_path, f"{directory}/linked.txt")
+            with open(f"{directory}/linked.txt", "rb") as f:
+                self.assertEqual(f.read(), b"same data")
+
 
 if __name__ == '__main__':
     unittest.main(warnings='ignore')
@@ -0,0 +1,80 @@
+import json
+import os
+from typing import Any, AnyStr, Dict, List
+
+from tasmanium import logger
+from tasmanium.boiled_pickle import Feature, Scenario
+from tasmanium.parse_cache import CACHE_PATH
+from tasmanium.scheduler import WorkUnit
+
+l = logger.getLogger(__name__)
+
+TIMINGS_PATH = f"{CACHE_PATH}/timings.json"
+# used for steps of scenarios which were never executed if there is no history at all
+DEFAULT_STEP_DURATION_NS = 1000000
+
+
+def scenario_key(scenario: Scenario) -> AnyStr:
+    """Scenarios are identified by their line, example rows of scenario outlines also by the line of the row"""
+    if scenario.example_line_in_file is not None:
+        return f"{scenario.line_in_file}:{scenario.example_line_in_file}"
+    return f"{scenario.line_in_file}"
+
+
+def load_timings() -> Dict[AnyStr, Dict[AnyStr, Any]]:
+    try:
+        with open(TIMINGS_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        l.ttrace(f"no timing history loaded: {e}")
+        return {}
+
+
+def save_timings(timings: Dict[AnyStr, Dict[AnyStr, Any]], features: List[Feature]):
+    """Merge execution times of executed features and scenarios into the timing history and save it"""
+    for feature in features:
+        if feature.results['execution_time_ns'] is None:
+            continue
+        entry = timings.setdefault(feature.uri, {'execution_time_ns': None, 'scenarios': {}})
+        entry['execution_time_ns'] = feature.results['execution_time_ns']
+        for position in feature.positions():
+            scenario = feature.scenario_at(position)
+            durations = [results['execution_time_ns'] for results in scenario.results if results['execution_time_ns'] is not None]
+            if len(durations) > 0:
+                entry['scenarios'][scenario_key(scenario)] = sum(durations)
+
+    os.makedirs(os.path.dirname(TIMINGS_PATH), exist_ok=True)
+    tmp_path = f"{TIMINGS_PATH}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(timings, f)
+        os.replace(tmp_path, TIMINGS_PATH)
+    except OSError as e:
+        l.warning(f"could not save timing history '{TIMINGS_PATH}': {e}")
+
+
+def estimate_unit_durations(units: List[WorkUnit], features: List[Feature], timings: Dict[AnyStr, Dict[AnyStr, Any]]) -> Dict[int, int]:
+    """
+    Estimate execution time of work units from the timing history.
+    Scenarios missing from the history are estimated by the average step duration of known scenarios times their step count.
+    """
+    known_time, known_steps = 0, 0
+    for feature in features:
+        recorded = timings.get(feature.uri, {}).get('scenarios', {})
+        for position in feature.positions():
+            scenario = feature.scenario_at(position)
+            if scenario_key(scenario) in recorded:
+                known_time += recorded[scenario_key(scenario)]
+                known_steps += len(scenario.steps)
+    step_duration = known_time / known_steps if known_steps > 0 else DEFAULT_STEP_DURATION_NS
+
+    estimates: Dict[int, int] = {}
+    for unit in units:
+        feature = features[unit.feature_index]
+        recorded = timings.get(feature.uri, {}).get('scenarios', {})
+        estimate = 0
+        for index in unit.scenario_indices:
+            scenario = feature.scenario_by_index(index)
+            estimate += recorded.get(scenario_key(scenario), step_duration * len(scenario.steps))
+        estimates[unit.identifier] = int(estimate)
+    return estimates
@@ -1,9 +1,10 @@
 import glob
 import importlib
 import pkgutil
+import re
 from copy import deepcopy
 from pathlib import Path
-from typing import Collection, AnyStr, List, Dict
+from typing import Collection, AnyStr, List, Dict, Set, Tuple
 
 from tasmanium import logger
 from tasmanium.boiled_pickle import Feature
@@ -11,6 +12,9 @@ from tasmanium.constants import FEATURES_PATH
 
 l = logger.getLogger(__name__)
 
+# `path/to/file.feature:42` or `path/to/file.feature:42:57`
+LINE_SELECTOR_RE = re.compile(r"(.+?)((?::\d+)+)")
+
 
 def _glob_files_in_paths(paths: Collection[AnyStr], prefix: AnyStr, extension: AnyStr) -> List[AnyStr]:
     """Given a collection of arbitrary path strings, returns a list of (absolute) paths to feature files."""
@@ -34,6 +38,29 @@ def _glob_feature_files_in_paths(paths: Collection[AnyStr]) -> List[AnyStr]:
     return _glob_files_in_paths(paths, FEATURES_PATH, ".feature")
 
 
+def _glob_feature_files_and_lines(paths: Collection[AnyStr]) -> Tuple[List[AnyStr], Dict[AnyStr, Set[int]]]:
+    """
+    Like `_glob_feature_files_in_paths`, but paths may also be feature files with line selectors (`file.feature:42`).
+    Returns the feature files and the selected lines by file, files selected also as a whole run all their scenarios.
+    """
+    file_paths: Dict[AnyStr, None] = {}  # ordered set
+    whole_files: Set[AnyStr] = set()
+    selected_lines: Dict[AnyStr, Set[int]] = {}
+    for path in paths:
+        match = LINE_SELECTOR_RE.fullmatch(path)
+        if match is None:
+            globbed = _glob_feature_files_in_paths([path])
+            whole_files.update(globbed)
+        else:
+            if Path(f"{FEATURES_PATH}/{match.group(1)}").resolve().is_dir():
+                raise ValueError(f"Lines can be selected only in a feature file, not in directory '{match.group(1)}'.")
+            globbed = _glob_feature_files_in_paths([match.group(1)])
+            selected_lines.setdefault(globbed[0], set()).update(int(line) for line in match.group(2)[1:].split(":"))
+        file_paths.update(dict.fromkeys(globbed))
+
+    return list(file_paths), {file_path: lines for file_path, lines in selected_lines.items() if file_path not in whole_files}
+
+
 def _import_submodules(package, recursive=True):
     """ Import all submodules of a module, recursively, including subpackages
     :param recursive: bool